@@ -0,0 +1,91 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+
+class Rejected(Exception):
+    """Raised when a request is turned away; `retry_after` is in whole seconds."""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """Per-key token buckets: `burst` requests at once, refilled at `rate` per second.
+
+    Buckets live in an LRU dict capped at max_keys; a key that falls out
+    simply starts again with a full bucket. rate <= 0 disables the limit.
+    """
+
+    def __init__(self, rate, burst, max_keys=100000):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key):
+        """Spends one token of `key`'s bucket or raises Rejected('rate_limited')."""
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens < 1.0:
+                self._buckets[key] = (tokens, now)
+                raise Rejected('rate_limited', max(1, math.ceil((1.0 - tokens) / self.rate)))
+            self._buckets[key] = (tokens - 1.0, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+
+
+class AdmissionController:
+    """Caps the requests in flight to a backend and how many may wait for a slot.
+
+    acquire() takes a slot at once if fewer than max_in_flight are taken,
+    otherwise waits up to queue_timeout seconds as one of at most max_queue
+    waiters. Anything beyond that is rejected immediately ('overloaded'), as
+    is a waiter whose time runs out ('queue_timeout'), so a slow backend
+    makes callers fail fast instead of piling up behind it. Every successful
+    acquire() must be paired with release().
+    """
+
+    def __init__(self, max_in_flight, max_queue, queue_timeout, retry_after=1):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.waiting = 0
+        self._slot_freed = threading.Condition(threading.Lock())
+
+    def acquire(self):
+        """Returns True if the caller had to queue; raises Rejected when turned away."""
+        with self._slot_freed:
+            if self.in_flight < self.max_in_flight and not self.waiting:
+                self.in_flight += 1
+                return False
+            if self.waiting >= self.max_queue:
+                raise Rejected('overloaded', self.retry_after)
+            self.waiting += 1
+            try:
+                deadline = time.monotonic() + self.queue_timeout
+                while self.in_flight >= self.max_in_flight:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._slot_freed.wait(remaining):
+                        if self.in_flight < self.max_in_flight:
+                            break
+                        raise Rejected('queue_timeout', self.retry_after)
+                self.in_flight += 1
+                return True
+            finally:
+                self.waiting -= 1
+
+    def release(self):
+        with self._slot_freed:
+            self.in_flight -= 1
+            self._slot_freed.notify()
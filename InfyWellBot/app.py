@@ -1,24 +1,89 @@
 import os
+import sqlite3
+import time
 import requests
-from flask import Flask, request, jsonify, render_template, redirect, url_for, session, flash, abort
+from contextlib import contextmanager
+from rasa_client import RasaClient, RASA_API_URLS, RASA_POOL_SIZE
+from admission import AdmissionController, RateLimiter, Rejected
+from metrics import Registry, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from structured_logging import get_logger, log_event
+import logging
+from write_behind import WriteBehindQueue
+from fast_path import FastPath, KNOWLEDGE_INTENTS
+from flask import (
+    Flask, request, jsonify, render_template, redirect, url_for, session, flash, abort, g,
+    has_request_context, before_render_template, template_rendered, Response, stream_with_context
+)
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import (
-    create_access_token, get_jwt_identity, jwt_required,
+    create_access_token, get_jwt, get_jwt_identity, jwt_required,
     JWTManager, set_access_cookies, unset_jwt_cookies
 )
 from werkzeug.security import generate_password_hash, check_password_hash
 from functools import wraps
-from datetime import datetime
-from sqlalchemy import func # <-- IMPT: Needed for charts
+from collections import Counter
+import queue
+import base64
+import codecs
+import csv
+import hmac
+import io
+import json
+import zlib
+from datetime import datetime, date, timedelta
+from sqlalchemy import event, func, literal, tuple_ # <-- IMPT: func needed for charts
+from sqlalchemy.engine import Engine
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from knowledge_sync import REQUIRED_COLUMNS as KNOWLEDGE_COLUMNS, ensure_unique_index, rebuild_intent_rollup, sync_knowledge
+from wellness_summary import (
+    read_latest as read_latest_rolling, read_latest_for_account as read_latest_rolling_for_account,
+    summary_line as rolling_summary_line
+)
 
 # --- App Initialization ---
 app = Flask(__name__)
+logger = get_logger('wellbot')
 
 # --- Database Configuration ---
-db_path = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'project.db')
+db_path = os.environ.get(
+    'WELLBOT_DB_PATH',
+    os.path.join(os.path.abspath(os.path.dirname(__file__)), 'project.db')
+)
 app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config["SECRET_KEY"] = "your-admin-session-secret-key"
+# Write-behind mode for /feedback: queue rows and commit them in batches
+app.config["FEEDBACK_WRITE_BEHIND"] = os.environ.get("FEEDBACK_WRITE_BEHIND", "0") == "1"
+app.config["FEEDBACK_BATCH_SIZE"] = int(os.environ.get("FEEDBACK_BATCH_SIZE", "100"))
+app.config["FEEDBACK_FLUSH_MS"] = int(os.environ.get("FEEDBACK_FLUSH_MS", "200"))
+app.config["FEEDBACK_QUEUE_SIZE"] = int(os.environ.get("FEEDBACK_QUEUE_SIZE", "10000"))
+app.config["FEEDBACK_ENQUEUE_TIMEOUT"] = float(os.environ.get("FEEDBACK_ENQUEUE_TIMEOUT", "0.5"))
+# Seconds the admin dashboard statistics are served from memory before re-reading the rollups
+app.config["DASHBOARD_STATS_TTL"] = float(os.environ.get("DASHBOARD_STATS_TTL", "10"))
+# Largest knowledge-base CSV accepted by /admin/import_tips, and how many row errors it reports
+app.config["KNOWLEDGE_IMPORT_MAX_MB"] = float(os.environ.get("KNOWLEDGE_IMPORT_MAX_MB", "20"))
+app.config["KNOWLEDGE_IMPORT_MAX_ERRORS"] = int(os.environ.get("KNOWLEDGE_IMPORT_MAX_ERRORS", "20"))
+# Per-connection SQLite settings. SQLITE_JOURNAL_MODE=WAL lets readers run alongside a
+# writer, but only when every process that opens project.db also sees its -wal/-shm files
+# (not the case with the single-file bind mounts in docker-compose.yml), so it is opt-in.
+app.config["SQLITE_JOURNAL_MODE"] = os.environ.get("SQLITE_JOURNAL_MODE", "").upper()
+app.config["SQLITE_CACHE_MB"] = int(os.environ.get("SQLITE_CACHE_MB", "32"))
+app.config["SQLITE_MMAP_MB"] = int(os.environ.get("SQLITE_MMAP_MB", "128"))
+# Answer unambiguous knowledge questions in /chat without calling Rasa (see fast_path.py)
+app.config["CHAT_FAST_PATH"] = os.environ.get("CHAT_FAST_PATH", "0") == "1"
+app.config["NLU_DATA_DIR"] = os.environ.get("NLU_DATA_DIR")  # defaults to ../milestone2_rasa/data
+app.config["KB_VERSION_CHECK_INTERVAL"] = float(os.environ.get("KB_VERSION_CHECK_INTERVAL", "2.0"))
+# Chat admission control: per-user messages per second (0 = unlimited) and burst,
+# concurrent Rasa calls per process, and how many more may wait (and for how long).
+app.config["CHAT_USER_RATE"] = float(os.environ.get("CHAT_USER_RATE", "1"))
+app.config["CHAT_USER_BURST"] = float(os.environ.get("CHAT_USER_BURST", "5"))
+app.config["CHAT_MAX_IN_FLIGHT"] = int(os.environ.get("CHAT_MAX_IN_FLIGHT", str(RASA_POOL_SIZE * len(RASA_API_URLS))))
+app.config["CHAT_MAX_QUEUE"] = int(os.environ.get("CHAT_MAX_QUEUE", "50"))
+app.config["CHAT_QUEUE_TIMEOUT"] = float(os.environ.get("CHAT_QUEUE_TIMEOUT", "2"))
+# /metrics answers requests carrying "Authorization: Bearer <METRICS_TOKEN>";
+# without a token set, only clients on this host.
+app.config["METRICS_TOKEN"] = os.environ.get("METRICS_TOKEN", "")
 
 # --- JWT Configuration ---
 app.config["JWT_SECRET_KEY"] = "3ae0710d88e55092c2cde9d5b597d0c1d51fae8fa54481b9f2c83bb4139e0243"
@@ -29,44 +94,205 @@ jwt = JWTManager(app)
 # --- Database Setup ---
 db = SQLAlchemy(app)
 
+@event.listens_for(Engine, 'connect')
+def _configure_sqlite(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA cache_size = -{app.config['SQLITE_CACHE_MB'] * 1024}")
+    cursor.execute(f"PRAGMA mmap_size = {app.config['SQLITE_MMAP_MB'] * 1024 * 1024}")
+    cursor.execute("PRAGMA temp_store = MEMORY")
+    if app.config["SQLITE_JOURNAL_MODE"] in ('WAL', 'DELETE', 'TRUNCATE'):
+        cursor.execute(f"PRAGMA journal_mode = {app.config['SQLITE_JOURNAL_MODE']}")
+        if app.config["SQLITE_JOURNAL_MODE"] == 'WAL':
+            cursor.execute("PRAGMA synchronous = NORMAL")
+    cursor.close()
+
+# --- Rasa Client (shared, keep-alive connection pool over the RASA_API_URL upstreams) ---
+rasa_client = RasaClient()
+
+# --- Request Timing & Metrics ---
+# Every request is timed end to end and split into stages: db (SQL statement
+# execution), jwt (token signature and claim checks), rasa (the webhook round
+# trip) and render (Jinja). The split is returned in a Server-Timing header
+# and aggregated into the histograms served on /metrics.
+metrics = Registry()
+REQUEST_COUNT = metrics.counter(
+    'wellbot_http_requests_total', 'HTTP requests handled.', ['method', 'endpoint', 'status'])
+REQUEST_SECONDS = metrics.histogram(
+    'wellbot_http_request_duration_seconds', 'End-to-end request time.', ['method', 'endpoint'])
+STAGE_SECONDS = metrics.histogram(
+    'wellbot_http_stage_duration_seconds', 'Time per request spent in one stage (db, jwt, rasa, render).',
+    ['endpoint', 'stage'])
+DB_QUERIES = metrics.counter('wellbot_db_queries_total', 'SQL statements executed while serving requests.', ['endpoint'])
+
+def add_stage_time(stage, seconds):
+    if has_request_context() and 'stage_times' in g:
+        g.stage_times[stage] = g.stage_times.get(stage, 0.0) + seconds
+
+@contextmanager
+def timed_stage(stage):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_stage_time(stage, time.perf_counter() - started)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    g.stage_times = {}
+    g.db_queries = 0
+
+@app.after_request
+def record_request_timing(response):
+    if 'request_started' not in g:
+        return response
+    elapsed = time.perf_counter() - g.request_started
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    REQUEST_COUNT.inc(request.method, endpoint, str(response.status_code))
+    REQUEST_SECONDS.observe(elapsed, request.method, endpoint)
+    for stage, seconds in g.stage_times.items():
+        STAGE_SECONDS.observe(seconds, endpoint, stage)
+    if g.db_queries:
+        DB_QUERIES.inc(endpoint, amount=g.db_queries)
+    timings = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in g.stage_times.items()]
+    timings.append(f"total;dur={elapsed * 1000:.2f}")
+    response.headers['Server-Timing'] = ', '.join(timings)
+    log_event(logger, logging.DEBUG, "request", method=request.method, endpoint=endpoint,
+              status=response.status_code, latency_ms=round(elapsed * 1000, 2), db_queries=g.db_queries,
+              **{f"{stage}_ms": round(seconds * 1000, 2) for stage, seconds in g.stage_times.items()})
+    return response
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    # One statement runs at a time per connection, so a single value is enough.
+    conn.info['query_started'] = time.perf_counter()
+
+@event.listens_for(Engine, 'handle_error')
+def _clear_query_timer(exception_context):
+    # after_cursor_execute does not run for a failed statement.
+    if exception_context.connection is not None:
+        exception_context.connection.info.pop('query_started', None)
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop('query_started', None)
+    if started is None:
+        return
+    if has_request_context() and 'stage_times' in g:
+        g.stage_times['db'] = g.stage_times.get('db', 0.0) + time.perf_counter() - started
+        g.db_queries += 1
+
+@before_render_template.connect_via(app)
+def _start_render_timer(sender, template, context, **extra):
+    g.render_started = time.perf_counter()
+
+@template_rendered.connect_via(app)
+def _stop_render_timer(sender, template, context, **extra):
+    if 'render_started' in g:
+        add_stage_time('render', time.perf_counter() - g.pop('render_started'))
+
+@jwt.decode_key_loader
+def _start_jwt_timer(jwt_header, jwt_data):
+    # Called by flask_jwt_extended just before the signature check.
+    if has_request_context():
+        g.jwt_started = time.perf_counter()
+    return app.config['JWT_SECRET_KEY']
+
+@jwt.token_verification_loader
+def _stop_jwt_timer(jwt_header, jwt_data):
+    # Called once the token has been decoded and its claims validated.
+    if has_request_context() and 'jwt_started' in g:
+        add_stage_time('jwt', time.perf_counter() - g.pop('jwt_started'))
+    return True
+
+@app.route('/metrics')
+def metrics_endpoint():
+    token = app.config["METRICS_TOKEN"]
+    if token:
+        allowed = hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}")
+    else:
+        allowed = request.remote_addr in ('127.0.0.1', '::1')
+    if not allowed:
+        return jsonify({"msg": "Forbidden"}), 403
+    return metrics.render(), 200, {'Content-Type': METRICS_CONTENT_TYPE}
+
 # --- Database Models ---
 class User(db.Model):
+    # wellness_user_id links the account to its rows in user_wellness_data,
+    # whose UserIDs come from the imported CSV, not from this table. Unset
+    # until an admin links it; unset accounts see no wellness data.
+    __table_args__ = (
+        db.Index('ix_user_wellness_user_id', 'wellness_user_id', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(128), nullable=False)
     preferred_language = db.Column(db.String(10), default='en', nullable=False)
     age_group = db.Column(db.String(20), nullable=True)
     is_admin = db.Column(db.Boolean, default=False, nullable=False)
+    wellness_user_id = db.Column(db.String, nullable=True)
 
     def __repr__(self):
         return f'<User {self.email}>'
 
 class HealthKnowledge(db.Model):
     __tablename__ = 'health_knowledge'
+    # Unique (intent, entity) is the action server's lookup key. Older databases
+    # get this index from load_knowledge.py or on app start-up.
+    __table_args__ = (
+        db.Index('ix_health_knowledge_intent_entity', 'intent', 'entity', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     intent = db.Column(db.String(100), nullable=False)
     entity = db.Column(db.String(100), nullable=False)
     response_en = db.Column(db.Text, nullable=False)
     response_hi = db.Column(db.Text, nullable=False)
 
+class KnowledgeBaseVersion(db.Model):
+    """Single-row generation counter the action server watches to reload its knowledge index."""
+    __tablename__ = 'kb_version'
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, default=0, nullable=False)
+
 class UserWellnessData(db.Model):
+    # The composite primary key doubles as the (UserID, Date) index used by
+    # per-user lookups and date-range queries. Existing all-TEXT tables are
+    # converted with `python load_db.py --migrate`.
     __tablename__ = 'user_wellness_data'
     UserID = db.Column(db.String, primary_key=True)
-    Date = db.Column(db.String, primary_key=True)
-    Steps = db.Column(db.String)
-    CaloriesBurned = db.Column(db.String)
-    DistanceKm = db.Column(db.String)
-    SleepHours = db.Column(db.String)
-    HeartRate = db.Column(db.String)
+    Date = db.Column(db.Date, primary_key=True)
+    Steps = db.Column(db.Integer)
+    CaloriesBurned = db.Column(db.Float)
+    DistanceKm = db.Column(db.Float)
+    SleepHours = db.Column(db.Float)
+    HeartRate = db.Column(db.Integer)
     FoodItem = db.Column(db.String)
-    CaloriesIntake = db.Column(db.String)
-    Protein_g = db.Column(db.String)
-    Fat_g = db.Column(db.String)
-    Carbs_g = db.Column(db.String)
-    WaterIntake_L = db.Column(db.String)
+    CaloriesIntake = db.Column(db.Float)
+    Protein_g = db.Column(db.Float)
+    Fat_g = db.Column(db.Float)
+    Carbs_g = db.Column(db.Float)
+    WaterIntake_L = db.Column(db.Float)
     Mood = db.Column(db.String)
     Recommendation = db.Column(db.Text)
 
+class UserWellnessRolling(db.Model):
+    """7- and 30-day rolling averages per (UserID, Date), maintained by load_db.py (see wellness_rollup.py)."""
+    __tablename__ = 'user_wellness_rolling'
+    UserID = db.Column(db.String, primary_key=True)
+    Date = db.Column(db.Date, primary_key=True)
+    Steps_7d = db.Column(db.Float)
+    SleepHours_7d = db.Column(db.Float)
+    CalorieBalance_7d = db.Column(db.Float)
+    WaterIntake_L_7d = db.Column(db.Float)
+    Steps_30d = db.Column(db.Float)
+    SleepHours_30d = db.Column(db.Float)
+    CalorieBalance_30d = db.Column(db.Float)
+    WaterIntake_L_30d = db.Column(db.Float)
+    Days_7d = db.Column(db.Integer, default=0, nullable=False)
+    Days_30d = db.Column(db.Integer, default=0, nullable=False)
+
 class ChatFeedback(db.Model):
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_id = db.Column(db.String(36), nullable=False)
@@ -75,6 +301,316 @@ class ChatFeedback(db.Model):
     rating = db.Column(db.String(10), nullable=False)
     comment = db.Column(db.Text, nullable=True)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    # Newest-first keyset pagination of the feedback log seeks on (timestamp, id).
+    __table_args__ = (db.Index('ix_chat_feedback_timestamp_id', 'timestamp', 'id'),)
+
+class FeedbackDailyRollup(db.Model):
+    """Feedback counts per UTC day and rating, kept current by /feedback."""
+    __tablename__ = 'feedback_daily_rollup'
+    day = db.Column(db.Date, primary_key=True)
+    rating = db.Column(db.String(10), primary_key=True)
+    count = db.Column(db.Integer, default=0, nullable=False)
+
+class KnowledgeIntentRollup(db.Model):
+    """Number of knowledge-base tips per intent, kept current by the admin tip routes."""
+    __tablename__ = 'knowledge_intent_rollup'
+    intent = db.Column(db.String(100), primary_key=True)
+    count = db.Column(db.Integer, default=0, nullable=False)
+
+
+def bump_knowledge_version():
+    """Increments kb_version inside the current session; commit together with the tip change."""
+    stmt = sqlite_insert(KnowledgeBaseVersion).values(id=1, version=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['id'],
+        set_={'version': KnowledgeBaseVersion.version + 1}
+    )
+    db.session.execute(stmt)
+
+
+# --- Dashboard Analytics ---
+_dashboard_stats_cache = {"expires": 0.0, "value": None}
+
+def record_feedback_rollup(day, rating, count=1):
+    """Counts feedback rows in feedback_daily_rollup; commit with the feedback itself."""
+    stmt = sqlite_insert(FeedbackDailyRollup).values(day=day, rating=rating, count=count)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['day', 'rating'],
+        set_={'count': FeedbackDailyRollup.count + count}
+    )
+    db.session.execute(stmt)
+
+def adjust_intent_rollup(intent, delta):
+    """Adds delta to the tip count for an intent; commit with the tip change."""
+    stmt = sqlite_insert(KnowledgeIntentRollup).values(intent=intent, count=max(delta, 0))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['intent'],
+        set_={'count': KnowledgeIntentRollup.count + delta}
+    )
+    db.session.execute(stmt)
+
+def rebuild_analytics_rollups():
+    """Recomputes both rollup tables from scratch (used to backfill existing databases)."""
+    day = func.date(ChatFeedback.timestamp)
+    db.session.query(FeedbackDailyRollup).delete()
+    db.session.execute(sqlite_insert(FeedbackDailyRollup).from_select(
+        ['day', 'rating', 'count'],
+        db.select(day, ChatFeedback.rating, func.count(ChatFeedback.id))
+          .where(ChatFeedback.timestamp.isnot(None))
+          .group_by(day, ChatFeedback.rating)
+    ))
+    rebuild_intent_rollup(db.session.connection())
+    db.session.commit()
+
+def write_feedback_batch(records):
+    """Inserts queued feedback rows and their rollup counts in one transaction."""
+    with app.app_context():
+        try:
+            db.session.add_all([ChatFeedback(**record) for record in records])
+            per_day = Counter((record['timestamp'].date(), record['rating']) for record in records)
+            for (day, rating), count in per_day.items():
+                record_feedback_rollup(day, rating, count)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+feedback_queue = None
+if app.config["FEEDBACK_WRITE_BEHIND"]:
+    feedback_queue = WriteBehindQueue(
+        write_feedback_batch,
+        max_batch=app.config["FEEDBACK_BATCH_SIZE"],
+        max_delay_ms=app.config["FEEDBACK_FLUSH_MS"],
+        max_size=app.config["FEEDBACK_QUEUE_SIZE"],
+        name='feedback-writer'
+    )
+
+def invalidate_dashboard_stats():
+    _dashboard_stats_cache["expires"] = 0.0
+
+def get_dashboard_stats():
+    """Returns the dashboard numbers and chart data, read from the rollup tables.
+
+    Rollups keep the cost independent of how much feedback history exists,
+    and the result is cached for DASHBOARD_STATS_TTL seconds on top of that.
+    """
+    now = time.monotonic()
+    if _dashboard_stats_cache["value"] is not None and now < _dashboard_stats_cache["expires"]:
+        return _dashboard_stats_cache["value"]
+
+    # --- 1. Calculate Statistics ---
+    total_users = User.query.count()
+    total_tips = db.session.query(func.coalesce(func.sum(KnowledgeIntentRollup.count), 0)).scalar()
+
+    rating_counts = dict(db.session.query(
+        FeedbackDailyRollup.rating,
+        func.sum(FeedbackDailyRollup.count)
+    ).group_by(FeedbackDailyRollup.rating).all())
+    total_feedback = sum(rating_counts.values())
+    positive_feedback = rating_counts.get('good', 0)
+    if total_feedback > 0:
+        satisfaction_rate = round((positive_feedback / total_feedback) * 100)
+    else:
+        satisfaction_rate = 0
+
+    # --- 2. Prepare Feedback Chart Data ---
+    negative_feedback = total_feedback - positive_feedback
+    chart_feedback_data = {
+        'labels': ['Positive', 'Negative'],
+        'data': [positive_feedback, negative_feedback]
+    }
+
+    # --- 3. Intent Count Chart ---
+    intent_counts = KnowledgeIntentRollup.query.filter(
+        KnowledgeIntentRollup.count > 0
+    ).order_by(KnowledgeIntentRollup.intent).all()
+
+    chart_intent_labels = [item.intent.replace('_', ' ').title() for item in intent_counts]
+    chart_intent_data = [item.count for item in intent_counts]
+
+    # --- 4. Activity Chart (Queries Per Day) ---
+    daily_counts = db.session.query(
+        FeedbackDailyRollup.day,
+        func.sum(FeedbackDailyRollup.count)
+    ).group_by(FeedbackDailyRollup.day).order_by(FeedbackDailyRollup.day).all()
+
+    if daily_counts:
+        chart_activity_labels = [row[0].strftime('%Y-%m-%d') for row in daily_counts]
+        chart_activity_data = [row[1] for row in daily_counts]
+    else:
+        # Fallback if no data exists
+        chart_activity_labels = ["No Data"]
+        chart_activity_data = [0]
+
+    stats = dict(
+        total_users=total_users,
+        total_tips=total_tips,
+        total_feedback=total_feedback,
+        satisfaction_rate=satisfaction_rate,
+        chart_feedback_data=chart_feedback_data,
+        chart_intent_labels=chart_intent_labels,
+        chart_intent_data=chart_intent_data,
+        chart_activity_labels=chart_activity_labels,
+        chart_activity_data=chart_activity_data,
+    )
+    _dashboard_stats_cache["value"] = stats
+    _dashboard_stats_cache["expires"] = now + app.config["DASHBOARD_STATS_TTL"]
+    return stats
+
+def init_db():
+    """Creates missing tables and brings older project.db files up to date."""
+    db.create_all()
+    with db.engine.begin() as conn:
+        ensure_unique_index(conn)
+        # Nor does it add columns declared later.
+        user_columns = {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({User.__tablename__})")}
+        if 'wellness_user_id' not in user_columns:
+            conn.exec_driver_sql(f"ALTER TABLE {User.__tablename__} ADD COLUMN wellness_user_id VARCHAR")
+        # create_all() skips tables that already exist, so add indexes declared later.
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+    if (FeedbackDailyRollup.query.first() is None and ChatFeedback.query.first() is not None) or \
+            (KnowledgeIntentRollup.query.first() is None and HealthKnowledge.query.first() is not None):
+        rebuild_analytics_rollups()
+
+
+# --- Chat Fast Path ---
+FAST_PATH_RESULTS = metrics.counter(
+    'wellbot_chat_fast_path_total', 'Chat messages answered locally (hit) or sent on to Rasa (miss).', ['result'])
+
+def read_knowledge_version():
+    version = db.session.get(KnowledgeBaseVersion, 1)
+    return version.version if version else 0
+
+def load_fast_path_knowledge():
+    rows = db.session.query(
+        HealthKnowledge.intent, HealthKnowledge.entity, HealthKnowledge.response_en, HealthKnowledge.response_hi
+    ).all()
+    return read_knowledge_version(), rows
+
+def sync_rasa_slots(batch):
+    """Tells Rasa about turns the fast path answered, so follow-up 'inform' turns keep their context."""
+    for sender, events in batch:
+        try:
+            rasa_client.append_events(sender, events)
+        except requests.RequestException as e:
+            log_event(logger, logging.WARNING, "rasa_slot_sync_failed", user_id=sender, error=str(e))
+
+fast_path = None
+rasa_slot_queue = None
+if app.config["CHAT_FAST_PATH"]:
+    fast_path = FastPath(
+        load_fast_path_knowledge, read_knowledge_version,
+        data_dir=app.config["NLU_DATA_DIR"], check_interval=app.config["KB_VERSION_CHECK_INTERVAL"]
+    )
+    if fast_path.enabled:
+        rasa_slot_queue = WriteBehindQueue(sync_rasa_slots, max_batch=50, max_delay_ms=50, name='rasa-slot-sync')
+        logger.info("Chat fast path on: %d templates", len(fast_path.templates))
+    else:
+        logger.warning("CHAT_FAST_PATH is set but no NLU templates were found; every message goes to Rasa")
+        fast_path = None
+
+def answer_locally(sender, message, language):
+    """Returns a reply from the knowledge base if the fast path can answer, else None."""
+    if fast_path is None:
+        return None
+    try:
+        with timed_stage('fast_path'):
+            hit = fast_path.answer(message, language)
+    except Exception:
+        # Rasa can still answer; don't fail the message over the shortcut.
+        log_event(logger, logging.ERROR, "chat_fast_path_failed", exc_info=True, user_id=sender)
+        hit = None
+    FAST_PATH_RESULTS.inc('hit' if hit else 'miss')
+    if hit is None:
+        return None
+    reply, intent, entity = hit
+    log_event(logger, logging.DEBUG, "chat_fast_path", user_id=sender, intent=intent, entity=entity)
+    try:
+        rasa_slot_queue.put((sender, [
+            {"event": "slot", "name": "last_knowledge_intent", "value": intent},
+            {"event": "slot", "name": "condition", "value": entity},
+        ]), timeout=0)
+    except (queue.Full, RuntimeError):
+        pass  # context sync is best effort; the reply itself is complete
+    if intent == 'ask_wellness_tip':
+        reply = with_rolling_summary(sender, reply, language)
+    return reply
+
+def with_rolling_summary(user_id, reply, language):
+    """Appends the user's 7-day averages to a wellness tip, as the action server does."""
+    try:
+        summary = rolling_summary_line(read_latest_rolling_for_account(db.session, user_id), language)
+    except Exception:
+        log_event(logger, logging.WARNING, "rolling_summary_failed", exc_info=True, user_id=user_id)
+        return reply
+    return f"{reply}\n\n{summary}" if summary else reply
+
+# --- Chat Admission Control ---
+# Spikes are shed at the door: a user over their token bucket gets 429, and
+# once CHAT_MAX_IN_FLIGHT Rasa calls are running and CHAT_MAX_QUEUE more are
+# waiting (each at most CHAT_QUEUE_TIMEOUT seconds), callers get 503 right
+# away. Both carry Retry-After. Latency stays bounded by the queue timeout
+# plus one Rasa call instead of growing with the backlog.
+ADMISSION_RESULTS = metrics.counter(
+    'wellbot_chat_admission_total',
+    'Chat admission decisions (admitted, queued, rate_limited, overloaded, queue_timeout).', ['result'])
+chat_rate_limiter = RateLimiter(app.config["CHAT_USER_RATE"], app.config["CHAT_USER_BURST"])
+rasa_admission = AdmissionController(
+    app.config["CHAT_MAX_IN_FLIGHT"], app.config["CHAT_MAX_QUEUE"], app.config["CHAT_QUEUE_TIMEOUT"]
+)
+
+def rejection_response(rejected):
+    if rejected.reason == 'rate_limited':
+        response = jsonify({"error": "You are sending messages too quickly. Please wait a moment."})
+        response.status_code = 429
+    else:
+        response = jsonify({"error": "The chatbot is busy right now. Please try again shortly."})
+        response.status_code = 503
+    response.headers['Retry-After'] = str(rejected.retry_after)
+    return response
+
+def limit_chat_rate(user_id):
+    """Returns a 429 response if the user is over their message rate, else None."""
+    try:
+        chat_rate_limiter.take(user_id)
+    except Rejected as rejected:
+        ADMISSION_RESULTS.inc(rejected.reason)
+        return rejection_response(rejected)
+    return None
+
+def admit_rasa_call():
+    """Takes one of the in-flight Rasa slots, queueing briefly if needed; raises Rejected.
+
+    The caller must call rasa_admission.release() when the Rasa call is over.
+    """
+    with timed_stage('admission'):
+        try:
+            queued = rasa_admission.acquire()
+        except Rejected as rejected:
+            ADMISSION_RESULTS.inc(rejected.reason)
+            raise
+    ADMISSION_RESULTS.inc('queued' if queued else 'admitted')
+
+# --- JWT Profile Claims ---
+def issue_access_token(user):
+    """Creates a token that also carries the profile fields the chat hot path needs."""
+    return create_access_token(
+        identity=str(user.id),
+        additional_claims={
+            "preferred_language": user.preferred_language,
+            "age_group": user.age_group
+        }
+    )
+
+def current_user_language():
+    """Preferred language from the token, falling back to the DB for tokens issued without it."""
+    claims = get_jwt()
+    if "preferred_language" in claims:
+        return claims["preferred_language"]
+    user = db.session.get(User, int(get_jwt_identity()))
+    return user.preferred_language if user else None
 
 
 # --- Admin Decorator ---
@@ -103,10 +639,7 @@ def register_page():
 @jwt_required(locations=["cookies"])
 def chat_page():
     """Serves the main chat HTML page, passing current language."""
-    current_user_id = get_jwt_identity()
-    user = db.session.get(User, int(current_user_id))
-    
-    current_language = user.preferred_language if user else 'en'
+    current_language = current_user_language() or 'en'
     
     return render_template('chat.html', current_language=current_language)
 
@@ -171,7 +704,7 @@ def login():
     user = User.query.filter_by(email=email).first()
 
     if user and check_password_hash(user.password_hash, password):
-        access_token = create_access_token(identity=str(user.id))
+        access_token = issue_access_token(user)
         response = jsonify(access_token=access_token)
         set_access_cookies(response, access_token)
         return response
@@ -201,33 +734,40 @@ def profile():
         if 'age_group' in data:
              user.age_group = data.get('age_group')
         db.session.commit()
-        return jsonify({"msg": "Profile updated successfully"})
+        # Re-issue the token so the language/age-group claims match the new profile.
+        access_token = issue_access_token(user)
+        response = jsonify({"msg": "Profile updated successfully", "access_token": access_token})
+        set_access_cookies(response, access_token)
+        return response
 
 @app.route('/chat', methods=['POST'])
 @jwt_required()
 def chat():
     current_user_id = get_jwt_identity()
-    user = db.session.get(User, int(current_user_id))
-    if not user:
+    user_language = current_user_language()
+    if not user_language:
          return jsonify({"error": "User authentication error"}), 404
 
-    user_language = user.preferred_language
     data = request.get_json()
     message = data.get('message')
     if not message:
         return jsonify({"error": "No message provided"}), 400
 
-    RASA_API_URL = "http://127.0.0.1:5005/webhooks/rest/webhook"
-    payload = {
-        "sender": current_user_id,
-        "message": message,
-        "metadata": {"user_language": user_language}
-    }
-    
+    limited = limit_chat_rate(current_user_id)
+    if limited is not None:
+        return limited
+
+    local_reply = answer_locally(current_user_id, message, user_language)
+    if local_reply is not None:
+        return jsonify({"reply": local_reply, "user_message": message})
+
+    try:
+        admit_rasa_call()
+    except Rejected as rejected:
+        return rejection_response(rejected)
     try:
-        rasa_response = requests.post(RASA_API_URL, json=payload, timeout=10)
-        rasa_response.raise_for_status()
-        bot_messages = rasa_response.json()
+        with timed_stage('rasa'):
+            bot_messages = rasa_client.send(current_user_id, message, {"user_language": user_language})
         
         bot_reply = "Rasa returned an empty response."
         if bot_messages and isinstance(bot_messages, list) and len(bot_messages) > 0:
@@ -237,9 +777,84 @@ def chat():
 
     except requests.exceptions.ConnectionError:
         return jsonify({"error": "Could not connect to the chatbot server"}), 503
-    except Exception as e:
-        print(f"!!! General Exception in /chat: {e}")
+    except requests.exceptions.Timeout:
+        return jsonify({"error": "The chatbot server took too long to respond"}), 504
+    except Exception:
+        log_event(logger, logging.ERROR, "chat_failed", exc_info=True, user_id=current_user_id)
         return jsonify({"error": "An internal error occurred"}), 500
+    finally:
+        rasa_admission.release()
+
+def sse_event(event, data):
+    """One Server-Sent Events frame with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.route('/chat/stream', methods=['POST'])
+@jwt_required()
+def chat_stream():
+    """Like /chat, but every bot message is sent as an SSE `message` event as soon as
+    Rasa produces it, followed by `done` (or `error` if Rasa fails mid-reply)."""
+    current_user_id = get_jwt_identity()
+    user_language = current_user_language()
+    if not user_language:
+         return jsonify({"error": "User authentication error"}), 404
+
+    data = request.get_json()
+    message = data.get('message')
+    if not message:
+        return jsonify({"error": "No message provided"}), 400
+
+    limited = limit_chat_rate(current_user_id)
+    if limited is not None:
+        return limited
+
+    release = None
+    local_reply = answer_locally(current_user_id, message, user_language)
+    if local_reply is not None:
+        bot_messages = iter([{"text": local_reply}])
+    else:
+        try:
+            admit_rasa_call()
+        except Rejected as rejected:
+            return rejection_response(rejected)
+        # Connect before the 200 goes out, so an unreachable Rasa is still a 503/504.
+        try:
+            with timed_stage('rasa'):
+                bot_messages = rasa_client.stream(current_user_id, message, {"user_language": user_language})
+        except Exception as e:
+            rasa_admission.release()
+            if isinstance(e, requests.exceptions.ConnectionError):
+                return jsonify({"error": "Could not connect to the chatbot server"}), 503
+            if isinstance(e, requests.exceptions.Timeout):
+                return jsonify({"error": "The chatbot server took too long to respond"}), 504
+            log_event(logger, logging.ERROR, "chat_failed", exc_info=True, user_id=current_user_id)
+            return jsonify({"error": "An internal error occurred"}), 500
+        # The slot is held until the stream is done; the server closes the
+        # response even if the client went away before it was read.
+        release = rasa_admission.release
+
+    def generate():
+        try:
+            for bot_message in bot_messages:
+                reply = {key: bot_message[key] for key in ('text', 'image', 'buttons') if bot_message.get(key)}
+                if reply:
+                    yield sse_event('message', reply)
+            yield sse_event('done', {"user_message": message})
+        except Exception:
+            log_event(logger, logging.ERROR, "chat_stream_failed", exc_info=True, user_id=current_user_id)
+            yield sse_event('error', {"error": "The chatbot stopped responding"})
+        finally:
+            close = getattr(bot_messages, 'close', None)
+            if close:
+                close()
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Keep reverse proxies (nginx) from buffering the stream.
+    response.headers['X-Accel-Buffering'] = 'no'
+    if release is not None:
+        response.call_on_close(release)
+    return response
 
 @app.route('/feedback', methods=['POST'])
 @jwt_required()
@@ -254,20 +869,32 @@ def feedback():
     if not all([user_message, bot_response, rating]):
         return jsonify({"msg": "Missing data"}), 400
     
+    record = dict(
+        user_id=current_user_id,
+        user_message=user_message,
+        bot_response=bot_response,
+        rating=rating,
+        comment=comment,
+        timestamp=datetime.utcnow()
+    )
+
+    if feedback_queue is not None:
+        try:
+            feedback_queue.put(record, timeout=app.config["FEEDBACK_ENQUEUE_TIMEOUT"])
+        except (queue.Full, RuntimeError):
+            response = jsonify({"msg": "Feedback service is busy, please retry"})
+            response.headers['Retry-After'] = '1'
+            return response, 503
+        return jsonify({"msg": "Feedback queued"}), 202
+
     try:
-        new_feedback = ChatFeedback(
-            user_id=current_user_id,
-            user_message=user_message,
-            bot_response=bot_response,
-            rating=rating,
-            comment=comment
-        )
-        db.session.add(new_feedback)
+        db.session.add(ChatFeedback(**record))
+        record_feedback_rollup(record['timestamp'].date(), rating)
         db.session.commit()
         return jsonify({"msg": "Feedback saved"}), 201
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        print(f"!!! Error saving feedback: {e}")
+        log_event(logger, logging.ERROR, "feedback_save_failed", exc_info=True, user_id=current_user_id)
         return jsonify({"msg": "Error saving feedback"}), 500
 
 # --- ADMIN DASHBOARD ROUTES ---
@@ -305,85 +932,387 @@ def admin_logout():
 def admin_dashboard():
     """Shows the main admin dashboard with analytics."""
 
-    # --- 1. Calculate Statistics ---
-    total_users = User.query.count()
-    total_tips = HealthKnowledge.query.count()
-    total_feedback = ChatFeedback.query.count()
+    stats = get_dashboard_stats()
 
-    positive_feedback = ChatFeedback.query.filter_by(rating='good').count()
-    if total_feedback > 0:
-        satisfaction_rate = round((positive_feedback / total_feedback) * 100)
-    else:
-        satisfaction_rate = 0
+    # Tables are fetched page by page from the /admin/api/* endpoints.
+    return render_template('admin_dashboard.html', **stats)
 
-    # --- 2. Prepare Feedback Chart Data ---
-    negative_feedback = total_feedback - positive_feedback
-    chart_feedback_data = {
-        'labels': ['Positive', 'Negative'],
-        'data': [positive_feedback, negative_feedback]
-    }
 
-    # --- 3. Intent Count Chart ---
-    intent_counts = db.session.query(
-        HealthKnowledge.intent,
-        func.count(HealthKnowledge.intent)
-    ).group_by(HealthKnowledge.intent).all()
+# --- ADMIN JSON APIs (keyset pagination) ---
 
-    chart_intent_labels = [item[0].replace('_', ' ').title() for item in intent_counts]
-    chart_intent_data = [item[1] for item in intent_counts]
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
 
-    # --- 4. Activity Chart (Queries Per Day) ---
-    daily_counts = db.session.query(
-        func.strftime("%Y-%m-%d", ChatFeedback.timestamp),
-        func.count(ChatFeedback.id)
-    ).group_by(func.strftime("%Y-%m-%d", ChatFeedback.timestamp)).all()
+def _encode_cursor(values):
+    raw = json.dumps([v.isoformat() if isinstance(v, (date, datetime)) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
 
-    if daily_counts:
-        chart_activity_labels = [row[0] for row in daily_counts]
-        chart_activity_data = [row[1] for row in daily_counts]
-    else:
-        # Fallback if no data exists
-        chart_activity_labels = ["No Data"]
-        chart_activity_data = [0]
+def _decode_cursor(cursor, columns):
+    """Turns an opaque cursor back into values typed like the given columns."""
+    values = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError("cursor does not match this listing")
+    typed = []
+    for column, value in zip(columns, values):
+        python_type = column.type.python_type
+        if python_type is datetime:
+            value = datetime.fromisoformat(value)
+        elif python_type is date:
+            value = date.fromisoformat(value)
+        typed.append(literal(value, type_=column.type))
+    return typed
 
-    # --- 5. Fetch Tables ---
-    try:
-        knowledge_base = HealthKnowledge.query.order_by(
-            HealthKnowledge.intent,
-            HealthKnowledge.entity
-        ).all()
-    except Exception:
-        knowledge_base = []
+def _parse_date_arg(name):
+    value = request.args.get(name)
+    return date.fromisoformat(value) if value else None
 
+def keyset_page(query, columns, serialize, descending=False):
+    """Returns one page of `query` ordered by `columns`, as a conditional JSON response.
+
+    The client passes back `next_cursor` as ?cursor= to get the following page;
+    each page is a seek past the last row's key, so the cost does not grow with
+    the page number. Responses carry an ETag and answer If-None-Match with 304.
+    """
     try:
-        feedback_logs = ChatFeedback.query.order_by(
-            ChatFeedback.timestamp.desc()
-        ).limit(50).all()
-    except Exception:
-        feedback_logs = []
+        limit = min(max(int(request.args.get('limit', API_PAGE_SIZE)), 1), API_MAX_PAGE_SIZE)
+        cursor = request.args.get('cursor')
+        if cursor:
+            key = tuple_(*columns)
+            after = tuple_(*_decode_cursor(cursor, columns))
+            query = query.filter(key < after if descending else key > after)
+    except (ValueError, TypeError):
+        return jsonify({"msg": "Invalid limit or cursor"}), 400
+
+    order = [c.desc() for c in columns] if descending else list(columns)
+    rows = query.order_by(*order).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor([getattr(rows[-1], c.key) for c in columns])
+
+    response = jsonify({"items": [serialize(row) for row in rows], "next_cursor": next_cursor})
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.add_etag()
+    return response.make_conditional(request)
 
+@app.route('/admin/api/knowledge')
+@admin_required
+def admin_api_knowledge():
+    """Knowledge-base tips ordered by (intent, entity). Filters: ?intent="""
+    query = HealthKnowledge.query
+    if request.args.get('intent'):
+        query = query.filter(HealthKnowledge.intent == request.args['intent'])
+    return keyset_page(
+        query, [HealthKnowledge.intent, HealthKnowledge.entity],
+        lambda tip: {
+            "id": tip.id, "intent": tip.intent, "entity": tip.entity,
+            "response_en": tip.response_en, "response_hi": tip.response_hi
+        }
+    )
+
+def _feedback_filters():
+    """SQL conditions for ?rating= ?user= ?from=YYYY-MM-DD ?to=YYYY-MM-DD; raises ValueError on bad dates.
+
+    Returns (conditions on the other columns, conditions on timestamp).
+    """
+    start, end = _parse_date_arg('from'), _parse_date_arg('to')
+    conditions, time_range = [], []
+    if request.args.get('rating'):
+        conditions.append(ChatFeedback.rating == request.args['rating'])
+    if request.args.get('user'):
+        conditions.append(ChatFeedback.user_id == request.args['user'])
+    if start:
+        time_range.append(ChatFeedback.timestamp >= datetime.combine(start, datetime.min.time()))
+    if end:
+        time_range.append(ChatFeedback.timestamp < datetime.combine(end, datetime.min.time()) + timedelta(days=1))
+    return conditions, time_range
+
+def _wellness_filters():
+    """SQL conditions for ?user= ?from=YYYY-MM-DD ?to=YYYY-MM-DD; raises ValueError on bad dates."""
+    start, end = _parse_date_arg('from'), _parse_date_arg('to')
+    conditions = []
+    if request.args.get('user'):
+        conditions.append(UserWellnessData.UserID == request.args['user'])
+    if start:
+        conditions.append(UserWellnessData.Date >= start)
+    if end:
+        conditions.append(UserWellnessData.Date <= end)
+    return conditions
+
+@app.route('/admin/api/feedback')
+@admin_required
+def admin_api_feedback():
+    """Feedback, newest first. Filters: ?rating= ?user= ?from=YYYY-MM-DD ?to=YYYY-MM-DD"""
     try:
-        user_logs = UserWellnessData.query.limit(50).all()
-    except Exception:
-        user_logs = []
+        conditions, time_range = _feedback_filters()
+    except ValueError:
+        return jsonify({"msg": "Dates must be YYYY-MM-DD"}), 400
+    return keyset_page(
+        ChatFeedback.query.filter(*conditions, *time_range), [ChatFeedback.timestamp, ChatFeedback.id],
+        lambda fb: {
+            "id": fb.id, "user_id": fb.user_id, "user_message": fb.user_message,
+            "bot_response": fb.bot_response, "rating": fb.rating, "comment": fb.comment,
+            "timestamp": fb.timestamp.isoformat() if fb.timestamp else None
+        },
+        descending=True
+    )
 
-    # --- 6. Render Template ---
-    return render_template(
-        'admin_dashboard.html',
-        total_users=total_users,
-        total_tips=total_tips,
-        total_feedback=total_feedback,
-        satisfaction_rate=satisfaction_rate,
-        chart_feedback_data=chart_feedback_data,
-        chart_intent_labels=chart_intent_labels,
-        chart_intent_data=chart_intent_data,
-        chart_activity_labels=chart_activity_labels,
-        chart_activity_data=chart_activity_data,
-        knowledge=knowledge_base,
-        user_logs=user_logs,
-        feedback_logs=feedback_logs
+@app.route('/admin/api/wellness')
+@admin_required
+def admin_api_wellness():
+    """Wellness rows ordered by (UserID, Date). Filters: ?user= ?from=YYYY-MM-DD ?to=YYYY-MM-DD"""
+    try:
+        conditions = _wellness_filters()
+    except ValueError:
+        return jsonify({"msg": "Dates must be YYYY-MM-DD"}), 400
+    return keyset_page(
+        UserWellnessData.query.filter(*conditions), [UserWellnessData.UserID, UserWellnessData.Date],
+        lambda row: {
+            column.name: (value.isoformat() if isinstance(value, date) else value)
+            for column in UserWellnessData.__table__.columns
+            for value in [getattr(row, column.name)]
+        }
     )
-    
+
+
+# --- Admin Exports (streamed CSV / NDJSON) ---
+EXPORT_BATCH_SIZE = 5000
+EXPORT_ROWS = metrics.counter('wellbot_admin_export_rows_total', 'Rows streamed by the admin exports.', ['dataset'])
+
+def keyset_batches(stmt, key_columns, batch_size=EXPORT_BATCH_SIZE):
+    """Yields the rows of a select() in `key_columns` order, batch_size rows at a time.
+
+    Every batch is its own short query that seeks past the last key seen,
+    and the session is closed in between, so no read transaction (and no
+    SQLite lock) is held while the client downloads. The key columns must
+    be the first columns of `stmt`.
+    """
+    key = tuple_(*key_columns)
+    last = None
+    while True:
+        batch = stmt
+        if last is not None:
+            batch = stmt.where(key > tuple_(*[literal(v, type_=c.type) for v, c in zip(last, key_columns)]))
+        rows = db.session.execute(batch.order_by(*key_columns).limit(batch_size)).all()
+        db.session.close()
+        if rows:
+            yield rows
+        if len(rows) < batch_size:
+            return
+        last = rows[-1][:len(key_columns)]
+
+def export_response(dataset, columns, batches):
+    """Streams `batches` of rows as a download, in constant memory.
+
+    ?format=csv|ndjson (default csv) ?gzip=1 sends it as a .gz file.
+    """
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({"msg": "format must be csv or ndjson"}), 400
+    compress = request.args.get('gzip') == '1'
+    names = [column.key for column in columns]
+    # Only date/datetime columns need converting; everything else is written as is.
+    dated = [i for i, column in enumerate(columns) if column.type.python_type in (date, datetime)]
+
+    def encode():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if fmt == 'csv':
+            writer.writerow(names)
+        try:
+            for rows in batches:
+                for row in rows:
+                    values = list(row)
+                    for i in dated:
+                        if values[i] is not None:
+                            values[i] = values[i].isoformat()
+                    if fmt == 'csv':
+                        writer.writerow(values)
+                    else:
+                        buffer.write(json.dumps(dict(zip(names, values)), ensure_ascii=False))
+                        buffer.write('\n')
+                EXPORT_ROWS.inc(dataset, amount=len(rows))
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue().encode('utf-8')
+        except Exception:
+            # The 200 is already sent; dropping the connection marks the file as incomplete.
+            log_event(logger, logging.ERROR, "export_failed", exc_info=True, dataset=dataset)
+            raise
+
+    def gzipped(chunks):
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+
+    filename = f"{dataset}-{date.today().isoformat()}.{fmt}"
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    body = encode()
+    if compress:
+        body, filename, mimetype = gzipped(body), filename + '.gz', 'application/gzip'
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['Cache-Control'] = 'no-store'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/admin/export/feedback')
+@admin_required
+def admin_export_feedback():
+    """All matching feedback in id order. Filters as /admin/api/feedback."""
+    try:
+        conditions, time_range = _feedback_filters()
+    except ValueError:
+        return jsonify({"msg": "Dates must be YYYY-MM-DD"}), 400
+    columns = [ChatFeedback.id, ChatFeedback.user_id, ChatFeedback.timestamp, ChatFeedback.rating,
+               ChatFeedback.user_message, ChatFeedback.bot_response, ChatFeedback.comment]
+    stmt = db.select(*columns).where(*conditions, *time_range)
+    if time_range:
+        # The (timestamp, id) index finds the id span of the date range, so the
+        # id-ordered batches only walk that part of the table.
+        low, high = db.session.execute(
+            db.select(func.min(ChatFeedback.id), func.max(ChatFeedback.id)).where(*time_range)
+        ).one()
+        stmt = stmt.where(ChatFeedback.id.between(low, high)) if low is not None else stmt.where(literal(False))
+    return export_response('feedback', columns, keyset_batches(stmt, [ChatFeedback.id]))
+
+@app.route('/admin/export/wellness')
+@admin_required
+def admin_export_wellness():
+    """All matching wellness rows in (UserID, Date) order. Filters as /admin/api/wellness."""
+    try:
+        conditions = _wellness_filters()
+    except ValueError:
+        return jsonify({"msg": "Dates must be YYYY-MM-DD"}), 400
+    columns = list(UserWellnessData.__table__.columns)
+    stmt = db.select(*columns).where(*conditions)
+    return export_response('wellness', columns, keyset_batches(stmt, [UserWellnessData.UserID, UserWellnessData.Date]))
+
+
+# --- Wellness Time Series ---
+WELLNESS_METRICS = {
+    name: getattr(UserWellnessData, name)
+    for name in ('Steps', 'CaloriesBurned', 'DistanceKm', 'SleepHours', 'HeartRate',
+                 'CaloriesIntake', 'Protein_g', 'Fat_g', 'Carbs_g', 'WaterIntake_L')
+}
+# SQLite expressions mapping a Date to the first day of its bucket (weeks start on Monday).
+WELLNESS_BUCKETS = {
+    'day': lambda column: column,
+    'week': lambda column: func.date(column, 'weekday 0', '-6 days'),
+    'month': lambda column: func.strftime('%Y-%m-01', column),
+    'year': lambda column: func.strftime('%Y-01-01', column),
+}
+
+def wellness_series(user_id):
+    """Aggregated buckets of one metric for one user, computed in SQLite.
+
+    ?metric= (default Steps) ?bucket=day|week|month|year (default day)
+    ?from=YYYY-MM-DD ?to=YYYY-MM-DD (inclusive). The (UserID, Date) primary
+    key turns the filter into a range scan over just that user's days.
+    """
+    metric_name = request.args.get('metric', 'Steps')
+    bucket_name = request.args.get('bucket', 'day')
+    if metric_name not in WELLNESS_METRICS:
+        return jsonify({"msg": f"Unknown metric; use one of {', '.join(WELLNESS_METRICS)}"}), 400
+    if bucket_name not in WELLNESS_BUCKETS:
+        return jsonify({"msg": f"Unknown bucket; use one of {', '.join(WELLNESS_BUCKETS)}"}), 400
+    try:
+        start, end = _parse_date_arg('from'), _parse_date_arg('to')
+    except ValueError:
+        return jsonify({"msg": "Dates must be YYYY-MM-DD"}), 400
+
+    metric = WELLNESS_METRICS[metric_name]
+    bucket = WELLNESS_BUCKETS[bucket_name](UserWellnessData.Date).label('bucket')
+    query = db.session.query(
+        bucket, func.count(metric), func.avg(metric), func.min(metric), func.max(metric), func.sum(metric)
+    ).filter(UserWellnessData.UserID == user_id, metric.isnot(None))
+    if start:
+        query = query.filter(UserWellnessData.Date >= start)
+    if end:
+        query = query.filter(UserWellnessData.Date <= end)
+    rows = query.group_by(bucket).order_by(bucket).all()
+
+    response = jsonify({
+        "user": user_id, "metric": metric_name, "bucket": bucket_name,
+        "from": start.isoformat() if start else None, "to": end.isoformat() if end else None,
+        "points": [
+            {"start": str(start_day), "count": count, "mean": mean, "min": low, "max": high, "sum": total}
+            for start_day, count, mean, low, high, total in rows
+        ]
+    })
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.add_etag()
+    return response.make_conditional(request)
+
+def linked_wellness_user_id():
+    """The wellness UserID linked to the logged-in account, or None."""
+    return db.session.query(User.wellness_user_id).filter(User.id == int(get_jwt_identity())).scalar()
+
+NOT_LINKED = {"msg": "No wellness data is linked to this account"}
+
+@app.route('/wellness/me/series')
+@jwt_required()
+def my_wellness_series():
+    """The series of the wellness rows an admin linked to the logged-in account."""
+    wellness_user_id = linked_wellness_user_id()
+    if wellness_user_id is None:
+        return jsonify(NOT_LINKED), 404
+    return wellness_series(wellness_user_id)
+
+@app.route('/wellness/<user_id>/series')
+@admin_required
+def user_wellness_series(user_id):
+    return wellness_series(user_id)
+
+def wellness_rolling(user_id):
+    """Latest rolling averages on or before ?date=YYYY-MM-DD (default: newest)."""
+    try:
+        on = _parse_date_arg('date')
+    except ValueError:
+        return jsonify({"msg": "Dates must be YYYY-MM-DD"}), 400
+    row = read_latest_rolling(db.session, user_id, on)
+    if row is None:
+        return jsonify({"msg": "No wellness data for this user"}), 404
+    response = jsonify(row)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.add_etag()
+    return response.make_conditional(request)
+
+@app.route('/wellness/me/rolling')
+@jwt_required()
+def my_wellness_rolling():
+    wellness_user_id = linked_wellness_user_id()
+    if wellness_user_id is None:
+        return jsonify(NOT_LINKED), 404
+    return wellness_rolling(wellness_user_id)
+
+@app.route('/wellness/<user_id>/rolling')
+@admin_required
+def user_wellness_rolling(user_id):
+    return wellness_rolling(user_id)
+
+@app.route('/admin/api/users/<int:id>/wellness_user_id', methods=['PUT'])
+@admin_required
+def admin_link_wellness(id):
+    """Links an account to a UserID of user_wellness_data; JSON {"wellness_user_id": "..." or null}."""
+    user = db.session.get(User, id)
+    if user is None:
+        return jsonify({"msg": "User not found"}), 404
+    wellness_user_id = (request.get_json(silent=True) or {}).get('wellness_user_id')
+    if wellness_user_id is not None:
+        wellness_user_id = str(wellness_user_id).strip() or None
+    user.wellness_user_id = wellness_user_id
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"msg": "That wellness UserID is already linked to another account"}), 409
+    return jsonify({"id": user.id, "email": user.email, "wellness_user_id": user.wellness_user_id})
 
 @app.route('/admin/add_tip', methods=['POST'])
 @admin_required
@@ -405,15 +1334,115 @@ def admin_add_tip():
             response_hi=response_hi
         )
         db.session.add(new_tip)
+        bump_knowledge_version()
+        adjust_intent_rollup(intent, 1)
         db.session.commit()
+        invalidate_dashboard_stats()
         flash("Health tip added successfully!", "success")
-    except Exception as e:
+    except IntegrityError:
+        db.session.rollback()
+        flash("A tip for this intent and entity already exists.", "error")
+    except Exception:
         db.session.rollback()
-        print(f"Error adding tip: {e}")
+        log_event(logger, logging.ERROR, "tip_add_failed", exc_info=True, intent=request.form.get("intent"))
         flash("Error adding tip to database.", "error")
     
     return redirect(url_for('admin_dashboard'))
 
+def read_knowledge_csv(stream, errors):
+    """Yields validated rows of a health_knowledge.csv upload as it is read.
+
+    Intents must be knowledge intents, all four columns non-empty and each
+    (intent, entity) pair appear once. Entities are lowercased like in
+    admin_add_tip. Invalid rows are skipped and described in `errors` as
+    (line, message); a bad header raises ValueError.
+    """
+    # Decoded line by line: on Python 3.10 the SpooledTemporaryFile Werkzeug
+    # keeps uploads in cannot be wrapped in io.TextIOWrapper.
+    reader = csv.DictReader(codecs.iterdecode(stream, 'utf-8-sig'))
+    missing = [column for column in KNOWLEDGE_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"CSV is missing columns: {', '.join(missing)}")
+    seen = {}
+    for row in reader:
+        line = reader.line_num
+        values = {column: (row[column] or '').strip() for column in KNOWLEDGE_COLUMNS}
+        values['entity'] = values['entity'].lower()
+        problem = None
+        if values['intent'] not in KNOWLEDGE_INTENTS:
+            problem = f"unknown intent '{values['intent']}'"
+        elif not all(values.values()):
+            problem = "empty " + ", ".join(column for column in KNOWLEDGE_COLUMNS if not values[column])
+        elif (values['intent'], values['entity']) in seen:
+            problem = f"duplicate of line {seen[(values['intent'], values['entity'])]}"
+        if problem:
+            errors.append((line, problem))
+            continue
+        seen[(values['intent'], values['entity'])] = line
+        yield values
+
+def import_result(message, category, status, **report):
+    """Flashes and redirects for the dashboard form; JSON for API clients."""
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({"msg": message, **report}), status
+    flash(message, category)
+    return redirect(url_for('admin_dashboard'))
+
+@app.route('/admin/import_tips', methods=['POST'])
+@admin_required
+def admin_import_tips():
+    """Applies an uploaded health_knowledge.csv to the knowledge base in one transaction.
+
+    Form fields: file, mode=upsert (insert new and update changed tips) or
+    sync (also delete tips missing from the file), dry_run=1 to report the
+    changes without keeping them. Any invalid row rejects the whole file.
+    """
+    if request.content_length and request.content_length > app.config["KNOWLEDGE_IMPORT_MAX_MB"] * 1024 * 1024:
+        return import_result(f"The file is larger than {app.config['KNOWLEDGE_IMPORT_MAX_MB']:g} MB.", "error", 413)
+    upload = request.files.get('file')
+    mode = request.form.get('mode', 'upsert')
+    dry_run = request.form.get('dry_run') == '1'
+    if upload is None or not upload.filename:
+        return import_result("Choose a CSV file to import.", "error", 400)
+    if mode not in ('upsert', 'sync'):
+        return import_result("Mode must be upsert or sync.", "error", 400)
+
+    errors = []
+    try:
+        # Validation and the diff against the current tips happen in the same pass.
+        summary = sync_knowledge(db.session.connection(), read_knowledge_csv(upload.stream, errors),
+                                 delete_missing=(mode == 'sync'))
+        if errors or dry_run:
+            db.session.rollback()
+        else:
+            db.session.commit()
+    except (ValueError, csv.Error) as e:
+        db.session.rollback()
+        return import_result(f"Could not read {upload.filename}: {e}", "error", 400)
+    except Exception:
+        db.session.rollback()
+        log_event(logger, logging.ERROR, "knowledge_import_failed", exc_info=True, filename=upload.filename)
+        return import_result("Error importing the knowledge base.", "error", 500)
+
+    if errors:
+        shown = errors[:app.config["KNOWLEDGE_IMPORT_MAX_ERRORS"]]
+        details = "; ".join(f"line {line}: {problem}" for line, problem in shown)
+        more = f" (and {len(errors) - len(shown)} more)" if len(errors) > len(shown) else ""
+        return import_result(f"{upload.filename} was not imported, {len(errors)} invalid rows: {details}{more}",
+                             "error", 400, errors=[{"line": line, "error": problem} for line, problem in errors])
+
+    changes = (f"{summary['inserted']} inserted, {summary['updated']} updated, "
+               f"{summary['deleted']} deleted, {summary['unchanged']} unchanged")
+    if dry_run:
+        return import_result(f"Dry run of {upload.filename} ({mode}): {changes}. Nothing was changed.",
+                             "success", 200, dry_run=True, **summary)
+    if summary['inserted'] or summary['updated'] or summary['deleted']:
+        # kb_version was bumped once inside the transaction; the fast path and
+        # the action server reload from it, and the dashboard counts come next.
+        invalidate_dashboard_stats()
+    log_event(logger, logging.INFO, "knowledge_imported", filename=upload.filename, mode=mode, **summary)
+    return import_result(f"Imported {upload.filename} ({mode}): {changes}.", "success", 200, dry_run=False, **summary)
+
 @app.route('/admin/delete_tip/<int:id>', methods=['POST'])
 @admin_required
 def admin_delete_tip(id):
@@ -421,7 +1450,10 @@ def admin_delete_tip(id):
         tip = db.session.get(HealthKnowledge, id)
         if tip:
             db.session.delete(tip)
+            bump_knowledge_version()
+            adjust_intent_rollup(tip.intent, -1)
             db.session.commit()
+            invalidate_dashboard_stats()
             flash("Health tip deleted successfully.", "success")
         else:
             flash("Tip not found.", "error")
@@ -433,5 +1465,5 @@ def admin_delete_tip(id):
 
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()
+        init_db()
     app.run(debug=True, port=5000, host='0.0.0.0')
\ No newline at end of file
@@ -0,0 +1,170 @@
+"""Answers simple knowledge questions in Flask without the Rasa round trip.
+
+The matcher is compiled from the Rasa training data: every ask_* example
+with a single `condition` entity becomes a template ("first aid for {}",
+"symptoms of {}"). A template seen under more than one intent is dropped.
+A message is answered locally only when exactly one (intent, entity) pair
+explains it: the message, normalized, is a known template with one
+knowledge-base entity (or NLU synonym of one) in the slot, and
+health_knowledge has a row for that exact pair. Everything else goes to
+Rasa as before.
+"""
+import os
+import re
+import threading
+import time
+import unicodedata
+
+try:
+    import yaml
+except ImportError:  # without PyYAML there are no templates and the fast path stays off
+    yaml = None
+
+KNOWLEDGE_INTENTS = ('ask_symptom', 'ask_first_aid', 'ask_wellness_tip', 'ask_prevention')
+DEFAULT_NLU_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'milestone2_rasa', 'data')
+# Words that never change which template a message matches.
+FILLER_WORDS = {'a', 'an', 'the', 'my', 'please', 'pls'}
+MAX_ENTITY_WORDS = 4
+
+_ANNOTATION = re.compile(r"\[([^\]]+)\]\((\w+)(?::([^)]+))?\)")
+_PUNCTUATION = re.compile(r"[^\w\s-]+|(?<!\w)-|-(?!\w)", re.UNICODE)
+SLOT = '{}'
+
+
+def normalize_words(text):
+    text = unicodedata.normalize('NFKC', text).casefold()
+    return [word for word in _PUNCTUATION.sub(' ', text).split() if word not in FILLER_WORDS]
+
+
+def _read_nlu_blocks(data_dir):
+    for root, _, files in os.walk(data_dir):
+        for filename in sorted(files):
+            if filename.endswith(('.yml', '.yaml')):
+                with open(os.path.join(root, filename), encoding='utf-8') as f:
+                    document = yaml.safe_load(f) or {}
+                for block in document.get('nlu') or []:
+                    if isinstance(block, dict):
+                        yield block
+
+
+def _examples(block):
+    for line in str(block.get('examples', '')).splitlines():
+        line = line.strip()
+        if line.startswith('-'):
+            yield line[1:].strip()
+
+
+def compile_templates(data_dir):
+    """Returns ({template words: intent}, {alias: entity}) from the NLU files."""
+    seen = {}
+    synonyms = {}
+    for block in _read_nlu_blocks(data_dir):
+        if 'synonym' in block:
+            for alias in _examples(block):
+                synonyms[' '.join(normalize_words(alias))] = block['synonym']
+            continue
+        intent = block.get('intent')
+        if intent not in KNOWLEDGE_INTENTS:
+            continue
+        for example in _examples(block):
+            annotations = _ANNOTATION.findall(example)
+            if len(annotations) != 1 or annotations[0][1] != 'condition':
+                continue
+            value, _, synonym = annotations[0]
+            if synonym:
+                synonyms[' '.join(normalize_words(value))] = synonym
+            template = tuple(normalize_words(_ANNOTATION.sub(' __slot__ ', example)))
+            template = tuple(SLOT if word == '__slot__' else word for word in template)
+            seen.setdefault(template, set()).add(intent)
+    templates = {template: intents.pop() for template, intents in seen.items() if len(intents) == 1}
+    return templates, synonyms
+
+
+class FastPath:
+    """Template matcher plus an in-memory copy of the knowledge rows it answers from.
+
+    `load_knowledge()` returns (version, rows of (intent, entity, response_en,
+    response_hi)); `read_version()` returns the current kb_version. The copy
+    is reloaded when the version changes, checked at most every
+    `check_interval` seconds.
+    """
+
+    def __init__(self, load_knowledge, read_version, data_dir=None, check_interval=2.0):
+        self._load_knowledge = load_knowledge
+        self._read_version = read_version
+        self.check_interval = check_interval
+        self.templates, self.synonyms = {}, {}
+        if yaml is not None:
+            data_dir = data_dir or DEFAULT_NLU_DATA_DIR
+            if os.path.isdir(data_dir):
+                self.templates, self.synonyms = compile_templates(data_dir)
+        self.version = None
+        self._answers = {}
+        self._entities = {}
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.templates)
+
+    def _reload(self):
+        version, rows = self._load_knowledge()
+        answers = {(intent, entity): (response_en, response_hi) for intent, entity, response_en, response_hi in rows}
+        entities = {' '.join(normalize_words(entity)): entity for _, entity in answers if entity != 'default'}
+        for alias, entity in self.synonyms.items():
+            key = ' '.join(normalize_words(entity))
+            if key in entities:
+                entities.setdefault(alias, entities[key])
+        self._answers, self._entities, self.version = answers, entities, version
+
+    def refresh(self):
+        now = time.monotonic()
+        if self.version is not None and now - self._last_check < self.check_interval:
+            return
+        with self._lock:
+            if self.version is not None and now - self._last_check < self.check_interval:
+                return
+            if self.version is None or self._read_version() != self.version:
+                self._reload()
+            self._last_check = now
+
+    def _entity_at(self, words, start, length):
+        phrase = ' '.join(words[start:start + length])
+        entity = self._entities.get(phrase)
+        if entity is None and length == 1 and phrase.endswith('s'):
+            entity = self._entities.get(phrase[:-1])
+        return entity
+
+    def match(self, message):
+        """Returns (intent, entity) if exactly one pair explains the message, else None."""
+        words = normalize_words(message)
+        found = set()
+        for start in range(len(words)):
+            for length in range(1, min(MAX_ENTITY_WORDS, len(words) - start) + 1):
+                entity = self._entity_at(words, start, length)
+                if entity is None:
+                    continue
+                template = tuple(words[:start]) + (SLOT,) + tuple(words[start + length:])
+                intent = self.templates.get(template)
+                if intent is not None:
+                    found.add((intent, entity))
+        if len(found) != 1:
+            return None
+        return found.pop()
+
+    def answer(self, message, language):
+        """Returns (reply, intent, entity) for an unambiguous, answerable message, else None."""
+        if not self.templates:
+            return None
+        self.refresh()
+        hit = self.match(message)
+        if hit is None:
+            return None
+        responses = self._answers.get(hit)
+        if responses is None:
+            return None
+        reply = responses[1] if language == 'hi' else responses[0]
+        if not reply:
+            return None
+        return reply, hit[0], hit[1]
@@ -0,0 +1,96 @@
+from sqlalchemy import text
+
+TABLE_NAME = 'health_knowledge'
+INTENT_ROLLUP_TABLE = 'knowledge_intent_rollup'
+INDEX_NAME = 'ix_health_knowledge_intent_entity'
+REQUIRED_COLUMNS = ['intent', 'entity', 'response_en', 'response_hi']
+
+
+def ensure_unique_index(conn):
+    """Adds the unique (intent, entity) index to databases created before it existed.
+
+    Duplicate rows left behind by the old append-only loader are removed first,
+    keeping the oldest row of each (intent, entity) pair. Expects kb_version and
+    knowledge_intent_rollup to exist. Returns the number of duplicates deleted.
+    """
+    deleted = conn.execute(text(
+        f"DELETE FROM {TABLE_NAME} WHERE id NOT IN "
+        f"(SELECT MIN(id) FROM {TABLE_NAME} GROUP BY intent, entity)"
+    )).rowcount
+    if deleted:
+        bump_version(conn)
+        rebuild_intent_rollup(conn)
+    conn.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS {INDEX_NAME} ON {TABLE_NAME} (intent, entity)"))
+    return deleted
+
+
+def bump_version(conn):
+    """Increments kb_version so the action server reloads its knowledge index."""
+    conn.execute(text(
+        "INSERT INTO kb_version (id, version) VALUES (1, 1) "
+        "ON CONFLICT(id) DO UPDATE SET version = version + 1"
+    ))
+
+
+def rebuild_intent_rollup(conn):
+    """Recounts tips per intent for the admin dashboard after a bulk change."""
+    conn.execute(text(f"DELETE FROM {INTENT_ROLLUP_TABLE}"))
+    conn.execute(text(
+        f"INSERT INTO {INTENT_ROLLUP_TABLE} (intent, count) "
+        f"SELECT intent, COUNT(*) FROM {TABLE_NAME} GROUP BY intent"
+    ))
+
+
+def sync_knowledge(conn, rows, delete_missing=False):
+    """Makes health_knowledge match `rows` in one pass on the given connection.
+
+    rows is an iterable of dicts with the REQUIRED_COLUMNS keys. New
+    (intent, entity) pairs are inserted, changed responses are updated and,
+    with delete_missing=True, pairs absent from rows are deleted. The caller
+    owns the transaction. kb_version is bumped and the intent rollup
+    recounted once if anything changed.
+    Returns a dict with inserted/updated/deleted/unchanged counts.
+    """
+    current = {
+        (intent, entity): (row_id, response_en, response_hi)
+        for row_id, intent, entity, response_en, response_hi in conn.execute(text(
+            f"SELECT id, intent, entity, response_en, response_hi FROM {TABLE_NAME}"
+        ))
+    }
+
+    inserts, updates, seen = [], [], set()
+    for row in rows:
+        key = (row['intent'], row['entity'])
+        if key in seen:
+            continue
+        seen.add(key)
+        existing = current.get(key)
+        if existing is None:
+            inserts.append({column: row[column] for column in REQUIRED_COLUMNS})
+        elif (existing[1], existing[2]) != (row['response_en'], row['response_hi']):
+            updates.append({"id": existing[0], "response_en": row['response_en'], "response_hi": row['response_hi']})
+
+    deletes = [{"id": value[0]} for key, value in current.items() if key not in seen] if delete_missing else []
+
+    if inserts:
+        conn.execute(text(
+            f"INSERT INTO {TABLE_NAME} (intent, entity, response_en, response_hi) "
+            f"VALUES (:intent, :entity, :response_en, :response_hi)"
+        ), inserts)
+    if updates:
+        conn.execute(text(
+            f"UPDATE {TABLE_NAME} SET response_en = :response_en, response_hi = :response_hi WHERE id = :id"
+        ), updates)
+    if deletes:
+        conn.execute(text(f"DELETE FROM {TABLE_NAME} WHERE id = :id"), deletes)
+    if inserts or updates or deletes:
+        bump_version(conn)
+    if inserts or deletes:
+        rebuild_intent_rollup(conn)
+
+    return {
+        "inserted": len(inserts),
+        "updated": len(updates),
+        "deleted": len(deletes),
+        "unchanged": len(seen) - len(inserts) - len(updates),
+    }
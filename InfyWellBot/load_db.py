@@ -1,34 +1,234 @@
+import argparse
 import pandas as pd
 from sqlalchemy import create_engine, text
 import os
+import sys
+import time
 
+from app import UserWellnessData, UserWellnessRolling
+from wellness_rollup import track_changes, refresh_rolling
 
-CSV_FILE_NAME = 'wellness.csv'  
 
-DB_PATH = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'project.db')
+CSV_FILE_NAME = 'wellness.csv'
+TABLE_NAME = 'user_wellness_data'
+LEGACY_TABLE_NAME = 'user_wellness_data_legacy'
+
+DB_PATH = os.environ.get('WELLBOT_DB_PATH', os.path.join(os.path.abspath(os.path.dirname(__file__)), 'project.db'))
 db_engine = create_engine(f'sqlite:///{DB_PATH}')
 
-try:
-    print(f"Reading {CSV_FILE_NAME}...")
-    
-    df = pd.read_csv(CSV_FILE_NAME, dtype=str)
-    
-    print(f"Found columns: {df.columns.tolist()}")
-
-
-    print("Writing 50,000 rows to 'user_wellness_data' table in project.db...")
-    df.to_sql('user_wellness_data', db_engine, if_exists='replace', index=False)
-    
-    print("\nSuccess! Database has been populated with your CSV data.")
-    print("\nFirst 5 rows from the new 'user_wellness_data' table:")
-    
-  
-    with db_engine.connect() as conn:
-        result = conn.execute(text("SELECT * FROM user_wellness_data LIMIT 5")).fetchall()
-        for row in result:
-            print(row)
-
-except FileNotFoundError:
-    print(f"ERROR: Could not find the file {CSV_FILE_NAME}. Make sure it's in the same folder as this script.")
-except Exception as e:
-    print(f"An error occurred: {e}")
\ No newline at end of file
+# --- Column types (must match UserWellnessData in app.py) ---
+COLUMNS = [column.name for column in UserWellnessData.__table__.columns]
+INTEGER_COLUMNS = ['Steps', 'HeartRate']
+REAL_COLUMNS = ['CaloriesBurned', 'DistanceKm', 'SleepHours', 'CaloriesIntake',
+                'Protein_g', 'Fat_g', 'Carbs_g', 'WaterIntake_L']
+
+CHUNK_ROWS = 50_000
+
+# Upsert keyed on (UserID, Date). The WHERE clause skips rows whose values are
+# unchanged, so re-loading an export only writes new or corrected days.
+_VALUE_COLUMNS = [c for c in COLUMNS if c not in ('UserID', 'Date')]
+UPSERT_SQL = (
+    f"INSERT INTO {TABLE_NAME} ({', '.join(COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in COLUMNS)}) "
+    f"ON CONFLICT(UserID, Date) DO UPDATE SET "
+    + ", ".join(f"{c} = excluded.{c}" for c in _VALUE_COLUMNS)
+    + " WHERE "
+    + " OR ".join(f"{TABLE_NAME}.{c} IS NOT excluded.{c}" for c in _VALUE_COLUMNS)
+)
+
+# Per-connection settings, applied to the loader's own connection only:
+# durability is relaxed for the duration of the load. The journal mode is
+# left alone because it is stored in project.db itself (see
+# SQLITE_JOURNAL_MODE in app.py for why WAL is opt-in).
+BULK_LOAD_PRAGMAS = [
+    "PRAGMA synchronous = OFF",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -65536",
+]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where unsupported."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def coerce_wellness_frame(df):
+    """Converts a frame of raw strings into typed rows ready for INSERT.
+
+    Unparseable numbers become NULL. Rows without a UserID or a valid Date
+    are dropped because they cannot be keyed.
+    Returns (rows, dropped_count).
+    """
+    df = df.reindex(columns=COLUMNS)
+    for column in INTEGER_COLUMNS:
+        df[column] = pd.to_numeric(df[column], errors='coerce').round().astype('Int64')
+    for column in REAL_COLUMNS:
+        df[column] = pd.to_numeric(df[column], errors='coerce')
+    df['Date'] = pd.to_datetime(df['Date'], errors='coerce').dt.strftime('%Y-%m-%d')
+
+    keyed = df['UserID'].notna() & df['Date'].notna()
+    dropped = int((~keyed).sum())
+    df = df[keyed].astype(object)
+    df = df.where(df.notna(), None)
+    return list(df.itertuples(index=False, name=None)), dropped
+
+
+def needs_migration(conn):
+    """True if user_wellness_data exists but still has the old all-TEXT, unkeyed layout."""
+    info = conn.execute(text(f"PRAGMA table_info({TABLE_NAME})")).fetchall()
+    if not info:
+        return False
+    columns = {row[1]: (row[2].upper(), row[5]) for row in info}
+    steps_type = columns.get('Steps', ('', 0))[0]
+    user_pk = columns.get('UserID', ('', 0))[1]
+    return steps_type != 'INTEGER' or not user_pk
+
+
+def migrate_wellness_table(engine, chunk_rows=CHUNK_ROWS):
+    """Rebuilds an existing untyped user_wellness_data table with the typed schema."""
+    with engine.begin() as conn:
+        if not needs_migration(conn):
+            print(f"'{TABLE_NAME}' already uses the typed schema.")
+            return
+        print(f"Migrating '{TABLE_NAME}' to the typed schema...")
+        conn.execute(text(f"ALTER TABLE {TABLE_NAME} RENAME TO {LEGACY_TABLE_NAME}"))
+        UserWellnessData.__table__.create(conn)
+
+        legacy_columns = [row[1] for row in conn.execute(text(f"PRAGMA table_info({LEGACY_TABLE_NAME})"))]
+        select_columns = ', '.join(c for c in COLUMNS if c in legacy_columns)
+        migrated, dropped, last_rowid = 0, 0, 0
+        while True:
+            # Walk the legacy table by rowid so only one chunk is in memory.
+            chunk = pd.read_sql_query(
+                text(f"SELECT rowid AS _rowid, {select_columns} FROM {LEGACY_TABLE_NAME} "
+                     f"WHERE rowid > :last ORDER BY rowid LIMIT :n"),
+                conn, params={"last": last_rowid, "n": chunk_rows}
+            )
+            if chunk.empty:
+                break
+            last_rowid = int(chunk['_rowid'].iloc[-1])
+            rows, skipped = coerce_wellness_frame(chunk.drop(columns='_rowid'))
+            conn.exec_driver_sql(UPSERT_SQL, rows)
+            migrated += len(rows)
+            dropped += skipped
+
+        conn.execute(text(f"DROP TABLE {LEGACY_TABLE_NAME}"))
+    print(f"Migrated {migrated} rows ({dropped} rows without a UserID/Date were dropped).")
+
+
+def load_csv(engine, csv_path, chunk_rows=CHUNK_ROWS, replace=False):
+    """Streams the CSV into user_wellness_data in chunks of chunk_rows.
+
+    Each chunk is written with one executemany inside its own transaction, so
+    memory stays bounded by the chunk size rather than the file size. Rows are
+    upserted on (UserID, Date); with replace=True the table is emptied first.
+    Afterwards the rolling averages around the days actually written (and
+    any left over by an earlier load that failed) are recomputed (see
+    wellness_rollup.py).
+    Returns a dict of load statistics.
+    """
+    with engine.begin() as conn:
+        UserWellnessData.__table__.create(conn, checkfirst=True)
+        UserWellnessRolling.__table__.create(conn, checkfirst=True)
+
+    started = time.perf_counter()
+    read = written = dropped = 0
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        for pragma in BULK_LOAD_PRAGMAS:
+            cursor.execute(pragma)
+        if replace:
+            cursor.execute(f"DELETE FROM {TABLE_NAME}")
+            cursor.execute(f"DELETE FROM {UserWellnessRolling.__tablename__}")
+            raw.commit()
+        # Without any rolling rows yet (first load, or a database from before
+        # the table existed) every user is rebuilt; otherwise only the windows
+        # around the days this load writes.
+        rebuild = (cursor.execute(f"SELECT 1 FROM {UserWellnessRolling.__tablename__} LIMIT 1").fetchone() is None)
+        track_changes(cursor)
+
+        print(f"Reading {csv_path} in chunks of {chunk_rows} rows...")
+        for chunk in pd.read_csv(csv_path, dtype=str, chunksize=chunk_rows):
+            rows, skipped = coerce_wellness_frame(chunk)
+            cursor.executemany(UPSERT_SQL, rows)
+            raw.commit()
+            # rowcount, unlike total_changes, leaves out the change-tracking trigger's rows.
+            written += max(cursor.rowcount, 0)
+            read += len(chunk)
+            dropped += skipped
+            print(f"  {read} rows read, {written} inserted/updated")
+        rolling = refresh_rolling(raw.driver_connection, full=rebuild)
+        print(f"Rolling averages: {rolling['rows_written']} rows for {rolling['users']} users "
+              f"recomputed in {rolling['seconds']:.1f}s")
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "rows_read": read,
+        "rows_written": written,
+        "rows_dropped": dropped,
+        "rolling_rows_written": rolling['rows_written'],
+        "seconds": elapsed,
+        "rows_per_second": read / elapsed if elapsed else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def rebuild_rolling(engine):
+    """Recomputes user_wellness_rolling for every user from user_wellness_data."""
+    with engine.begin() as conn:
+        UserWellnessRolling.__table__.create(conn, checkfirst=True)
+    raw = engine.raw_connection()
+    try:
+        return refresh_rolling(raw.driver_connection, full=True)
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load wellness CSV data into project.db")
+    parser.add_argument('csv', nargs='?', default=CSV_FILE_NAME)
+    parser.add_argument('--migrate', action='store_true',
+                        help="Only convert an existing all-TEXT table to the typed schema")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS,
+                        help="Rows per chunk/transaction (default: %(default)s)")
+    parser.add_argument('--replace', action='store_true',
+                        help="Delete all existing rows before loading instead of upserting")
+    parser.add_argument('--rebuild-rolling', action='store_true',
+                        help="Only recompute the rolling averages of every user from the loaded rows")
+    args = parser.parse_args()
+
+    try:
+        migrate_wellness_table(db_engine, args.chunk_rows)
+        if args.rebuild_rolling:
+            stats = rebuild_rolling(db_engine)
+            print(f"Rebuilt {stats['rows_written']} rolling rows for {stats['users']} users "
+                  f"in {stats['seconds']:.1f}s")
+        elif not args.migrate:
+            stats = load_csv(db_engine, args.csv, args.chunk_rows, args.replace)
+
+            print("\nSuccess! Database has been populated with your CSV data.")
+            print(f"Read {stats['rows_read']} rows, inserted/updated {stats['rows_written']}, "
+                  f"skipped {stats['rows_dropped']} without a UserID/Date.")
+            rss = stats['peak_rss_mb']
+            print(f"{stats['rows_per_second']:.0f} rows/s over {stats['seconds']:.1f}s, "
+                  f"peak RSS {'n/a' if rss is None else f'{rss:.0f} MB'}")
+
+    except FileNotFoundError:
+        print(f"ERROR: Could not find the file {args.csv}. Make sure it's in the same folder as this script.")
+    except Exception as e:
+        print(f"An error occurred: {e}")
@@ -1,40 +1,57 @@
+import argparse
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine
 import os
 
+from app import HealthKnowledge, KnowledgeBaseVersion, KnowledgeIntentRollup
+from knowledge_sync import REQUIRED_COLUMNS, ensure_unique_index, sync_knowledge
+
 # --- CONFIGURATION ---
 CSV_FILE_NAME = 'health_knowledge.csv'
 TABLE_NAME = 'health_knowledge'
-DB_PATH = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'project.db')
+DB_PATH = os.environ.get('WELLBOT_DB_PATH', os.path.join(os.path.abspath(os.path.dirname(__file__)), 'project.db'))
 # ---------------------
 
 # Create engine
 db_engine = create_engine(f'sqlite:///{DB_PATH}')
 
+parser = argparse.ArgumentParser(description="Load health_knowledge.csv into project.db")
+parser.add_argument('csv', nargs='?', default=CSV_FILE_NAME)
+parser.add_argument('--mode', choices=['upsert', 'sync'], default='upsert',
+                    help="upsert: insert new and update changed rows (default); "
+                         "sync: also delete rows that are not in the CSV")
+args = parser.parse_args()
+
 try:
-    print(f"Reading {CSV_FILE_NAME}...")
-    df = pd.read_csv(CSV_FILE_NAME)
-    
+    print(f"Reading {args.csv}...")
+    df = pd.read_csv(args.csv, dtype=str, keep_default_na=False)
+
     print(f"Found columns: {df.columns.tolist()}")
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"CSV is missing columns: {missing}")
+
+    # Entities are matched in lowercase by the action server (same as admin_add_tip).
+    df['entity'] = df['entity'].str.strip().str.lower()
+    df['intent'] = df['intent'].str.strip()
+
+    with db_engine.begin() as conn:
+        HealthKnowledge.__table__.create(conn, checkfirst=True)
+        KnowledgeBaseVersion.__table__.create(conn, checkfirst=True)
+        KnowledgeIntentRollup.__table__.create(conn, checkfirst=True)
+        duplicates = ensure_unique_index(conn)
+        if duplicates:
+            print(f"Removed {duplicates} duplicate (intent, entity) rows left by earlier appends.")
+
+        print(f"Applying '{args.mode}' to '{TABLE_NAME}' table in project.db...")
+        summary = sync_knowledge(conn, df[REQUIRED_COLUMNS].to_dict('records'),
+                                 delete_missing=(args.mode == 'sync'))
 
-    # --- THIS IS THE CHANGE ---
-    # We use 'append' to add data to the table created by app.py
-    # We set 'if_exists='append''
-    # We set index=False so pandas doesn't create its own index column
-    print(f"Appending data to '{TABLE_NAME}' table in project.db...")
-    df.to_sql(TABLE_NAME, db_engine, if_exists='append', index=False)
-    # --- END CHANGE ---
-
-    print(f"\nSuccess! Health Knowledge Base has been populated.")
-    
-    # Verify by reading back from the DB
-    with db_engine.connect() as conn:
-        result = conn.execute(text(f"SELECT COUNT(*) FROM {TABLE_NAME}")).fetchone()
-        print(f"Total rows in '{TABLE_NAME}': {result[0]}")
+    print(f"\nSuccess! Health Knowledge Base is up to date.")
+    print(f"Inserted {summary['inserted']}, updated {summary['updated']}, "
+          f"deleted {summary['deleted']}, unchanged {summary['unchanged']}.")
 
 except FileNotFoundError:
-    print(f"ERROR: Could not find the file {CSV_FILE_NAME}.")
+    print(f"ERROR: Could not find the file {args.csv}.")
 except Exception as e:
     print(f"An error occurred: {e}")
-    print("This can happen if the 'health_knowledge' table doesn't exist.")
-    print("Please run 'python app.py' once to create the tables before running this script.")
\ No newline at end of file
@@ -0,0 +1,106 @@
+"""Minimal in-process Prometheus counters and histograms.
+
+Only what the app needs: label sets are fixed per metric, updates are a dict
+lookup plus a few additions under one lock, and render() produces the
+Prometheus text exposition format for the /metrics endpoint. Values are per
+process; with several workers, scrape each one (or sum them).
+
+InfyWellBot/metrics.py and milestone2_rasa/actions/metrics.py are the same
+file; edit both (InfyWellBot/tests/test_shared_modules.py checks).
+"""
+import bisect
+import threading
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + (list(extra.items()) if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labelvalues, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                # Per-bucket counts (last slot is +Inf), then sum and count.
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._series.items())
+        for labelvalues, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(list(self.buckets) + ['+Inf'], counts):
+                cumulative += bucket_count
+                le = {"le": bound if bound == '+Inf' else repr(float(bound))}
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labelvalues, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, *args, **kwargs):
+        metric = Counter(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, *args, **kwargs):
+        metric = Histogram(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
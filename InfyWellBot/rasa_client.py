@@ -0,0 +1,311 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import requests
+from urllib.parse import quote
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+logger = logging.getLogger('wellbot.rasa')
+
+# --- Configuration (override with environment variables) ---
+# One webhook URL, or several separated by commas to spread load over Rasa replicas.
+RASA_API_URL = os.environ.get('RASA_API_URL', 'http://127.0.0.1:5005/webhooks/rest/webhook')
+RASA_API_URLS = [url.strip() for url in RASA_API_URL.split(',') if url.strip()]
+# Connections kept open to each Rasa upstream.
+RASA_POOL_SIZE = int(os.environ.get('RASA_POOL_SIZE', '20'))
+RASA_CONNECT_TIMEOUT = float(os.environ.get('RASA_CONNECT_TIMEOUT', '2'))
+RASA_READ_TIMEOUT = float(os.environ.get('RASA_READ_TIMEOUT', '10'))
+# Rasa HTTP API roots (needs `rasa run --enable-api`), in the same order as
+# RASA_API_URL; default to each webhook URL's host.
+RASA_SERVER_URL = os.environ.get(
+    'RASA_SERVER_URL', ','.join(url.split('/webhooks/')[0] for url in RASA_API_URLS)
+)
+# Consecutive failures that open an upstream's circuit breaker, and how long
+# it stays open before one trial request is let through.
+RASA_BREAKER_FAILURES = int(os.environ.get('RASA_BREAKER_FAILURES', '5'))
+RASA_BREAKER_COOLDOWN = float(os.environ.get('RASA_BREAKER_COOLDOWN', '10'))
+# Seconds between background health probes of every upstream (0 disables them).
+RASA_HEALTH_INTERVAL = float(os.environ.get('RASA_HEALTH_INTERVAL', '5'))
+# A conversation leaves its home upstream when that one has this many more
+# requests in flight than the least busy upstream.
+RASA_STICKY_SLACK = int(os.environ.get('RASA_STICKY_SLACK', '10'))
+
+
+class NoUpstreamAvailable(requests.exceptions.ConnectionError):
+    """Every Rasa upstream has an open circuit breaker or a full connection pool."""
+
+
+def _never_sent(exc):
+    """True if the request failed before reaching Rasa, so another upstream may take it."""
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(exc.args[0], 'reason', None) if exc.args else None
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+
+class Upstream:
+    """One Rasa server: requests in flight plus a consecutive-failure circuit breaker.
+
+    The breaker is closed while requests succeed. After `max_failures`
+    failures in a row it opens and the upstream is skipped for `cooldown`
+    seconds; then it is half-open and a single trial request (or health
+    probe) decides whether it closes again or reopens. At most
+    `max_in_flight` requests (the connection pool size) run at once, so
+    none of them waits for a pooled connection outside the timeouts.
+    """
+
+    def __init__(self, url, server_url, max_failures=RASA_BREAKER_FAILURES, cooldown=RASA_BREAKER_COOLDOWN,
+                 max_in_flight=RASA_POOL_SIZE):
+        self.url = url
+        self.server_url = server_url.rstrip('/')
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.max_in_flight = max_in_flight
+        self.outstanding = 0
+        self.failures = 0
+        self.opened_at = None
+        self._tickets = 0
+        self._trial = None
+        self._lock = threading.Lock()
+        self.key = hashlib.blake2b(url.encode(), digest_size=8).digest()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        return 'half-open' if time.monotonic() - self.opened_at >= self.cooldown else 'open'
+
+    def available(self):
+        state = self.state
+        if self.outstanding >= self.max_in_flight:
+            return False
+        return state == 'closed' or (state == 'half-open' and self._trial is None)
+
+    def start(self):
+        """Counts a request in and returns its ticket for finish(), or None if the
+        breaker or a full pool turned it away meanwhile."""
+        with self._lock:
+            state = self.state
+            if state == 'open' or (state == 'half-open' and self._trial is not None):
+                return None
+            if self.outstanding >= self.max_in_flight:
+                return None
+            self._tickets += 1
+            if state == 'half-open':
+                self._trial = self._tickets
+            self.outstanding += 1
+            return self._tickets
+
+    def finish(self, ticket, ok):
+        with self._lock:
+            self.outstanding -= 1
+            # Only the trial itself ends the trial; older requests may still be finishing.
+            if ticket == self._trial:
+                self._trial = None
+            self._record(ok)
+
+    def _record(self, ok):
+        if ok:
+            if self.opened_at is not None:
+                logger.info("Rasa upstream %s is healthy again", self.url)
+            self.failures, self.opened_at = 0, None
+            return
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.max_failures:
+            if self.opened_at is None:
+                logger.warning("Rasa upstream %s failed %d times in a row; skipping it for %.0fs",
+                               self.url, self.failures, self.cooldown)
+            self.opened_at = time.monotonic()
+
+    def probed(self, ok):
+        """Applies a health probe result; a failed probe opens the breaker at once."""
+        with self._lock:
+            if not ok:
+                self.failures = max(self.failures, self.max_failures - 1)
+            self._record(ok)
+
+
+class RasaClient:
+    """Shared HTTP client for the Flask -> Rasa REST webhook hop.
+
+    One requests.Session is reused for every message, so TCP connections to
+    Rasa are kept alive and pooled instead of being opened per request.
+    pool_size is per upstream and caps the requests in flight to it; past
+    that a request goes to another upstream, or fails with
+    NoUpstreamAvailable when all are full, instead of waiting for a
+    connection.
+
+    With several upstreams, each sender has a home upstream picked by
+    rendezvous hashing, so a conversation keeps going to the same Rasa node
+    while it is healthy, and losing a node only moves that node's senders.
+    A sender goes to the upstream with the fewest requests in flight instead
+    when its home is unavailable or busier than that one by `sticky_slack`.
+    Upstreams whose breaker is open are skipped; a request that could not
+    even connect is retried on the next one. A daemon thread probes every
+    upstream each `health_interval` seconds, so a dead node is taken out
+    before users hit it and a recovered one comes back without waiting for
+    traffic.
+    """
+
+    def __init__(self, url=RASA_API_URL, pool_size=RASA_POOL_SIZE,
+                 connect_timeout=RASA_CONNECT_TIMEOUT, read_timeout=RASA_READ_TIMEOUT,
+                 server_url=None, health_interval=RASA_HEALTH_INTERVAL, sticky_slack=RASA_STICKY_SLACK):
+        urls = [u.strip() for u in url.split(',') if u.strip()] if isinstance(url, str) else list(url)
+        if server_url is None:
+            server_url = RASA_SERVER_URL if url == RASA_API_URL else [u.split('/webhooks/')[0] for u in urls]
+        server_urls = [u.strip() for u in server_url.split(',')] if isinstance(server_url, str) else list(server_url)
+        if len(server_urls) != len(urls):
+            raise ValueError("RASA_SERVER_URL needs one entry per RASA_API_URL entry")
+        self.upstreams = [Upstream(u, s, max_in_flight=pool_size) for u, s in zip(urls, server_urls)]
+        self.timeout = (connect_timeout, read_timeout)
+        self.health_interval = health_interval
+        self.sticky_slack = sticky_slack
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(self.upstreams), pool_maxsize=pool_size, pool_block=True)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        # Probes get their own connections so a saturated pool cannot delay them.
+        self._probe_session = requests.Session()
+        self._closed = threading.Event()
+        self._lock = threading.Lock()
+        self._prober = None
+
+    def _ensure_probing(self):
+        # Started lazily so a pre-forking server gets one prober per worker process.
+        if not self.health_interval or (self._prober is not None and self._prober.is_alive()):
+            return
+        with self._lock:
+            if self._prober is None or not self._prober.is_alive():
+                self._prober = threading.Thread(target=self._probe_loop, name='rasa-health', daemon=True)
+                self._prober.start()
+
+    def _probe_loop(self):
+        while not self._closed.wait(self.health_interval):
+            for upstream in self.upstreams:
+                try:
+                    ok = self._probe_session.get(upstream.server_url + '/', timeout=self.timeout).status_code < 500
+                except requests.exceptions.RequestException:
+                    ok = False
+                upstream.probed(ok)
+
+    def warm_up(self):
+        """Opens a pooled connection to every upstream (marking the ones that do not
+        answer as down) and starts the health probes."""
+        for upstream in self.upstreams:
+            try:
+                ok = self.session.get(upstream.server_url + '/', timeout=self.timeout).status_code < 500
+            except requests.exceptions.RequestException:
+                ok = False
+            upstream.probed(ok)
+        self._ensure_probing()
+
+    def _candidates(self, sender):
+        """Upstreams to try, best first: home (or least busy), then the rest in rendezvous order."""
+        if len(self.upstreams) == 1:
+            return [u for u in self.upstreams if u.available()]
+        seed = str(sender).encode()
+        ranked = sorted(self.upstreams, key=lambda u: hashlib.blake2b(seed, key=u.key, digest_size=8).digest(),
+                        reverse=True)
+        available = [u for u in ranked if u.available()]
+        if len(available) < 2:
+            return available
+        home, least = available[0], min(available, key=lambda u: u.outstanding)
+        if sender is None or home.outstanding - least.outstanding > self.sticky_slack:
+            available.remove(least)
+            available.insert(0, least)
+        return available
+
+    def _post(self, sender, path_url, **kwargs):
+        """Posts to the first upstream that takes the request; returns (upstream, ticket, response).
+
+        The upstream stays counted as in flight until the caller calls
+        upstream.finish(ticket, ok).
+        """
+        self._ensure_probing()
+        last_error = None
+        for upstream in self._candidates(sender):
+            ticket = upstream.start()
+            if ticket is None:
+                continue
+            try:
+                response = self.session.post(path_url(upstream), timeout=self.timeout, **kwargs)
+            except requests.exceptions.RequestException as e:
+                upstream.finish(ticket, ok=False)
+                if isinstance(e, requests.exceptions.ConnectionError) and _never_sent(e):
+                    last_error = e
+                    continue
+                raise
+            if response.status_code >= 500:
+                upstream.finish(ticket, ok=False)
+                try:
+                    response.raise_for_status()
+                finally:
+                    response.close()
+            return upstream, ticket, response
+        if last_error is not None:
+            raise last_error
+        raise NoUpstreamAvailable("No Rasa upstream is available")
+
+    def send(self, sender, message, metadata=None):
+        """Posts one user message and returns Rasa's list of bot messages."""
+        payload = {"sender": sender, "message": message, "metadata": metadata or {}}
+        upstream, ticket, response = self._post(sender, lambda u: u.url, json=payload)
+        try:
+            response.raise_for_status()
+            return response.json()
+        finally:
+            upstream.finish(ticket, ok=True)
+
+    def stream(self, sender, message, metadata=None):
+        """Posts one user message with ?stream=true and returns an iterator over
+        Rasa's bot messages, each yielded as soon as Rasa sends it.
+
+        The request is made and HTTP errors are raised here; the pooled
+        connection is released when the iterator is exhausted or closed.
+        """
+        payload = {"sender": sender, "message": message, "metadata": metadata or {}}
+        upstream, ticket, response = self._post(sender, lambda u: u.url, json=payload,
+                                                params={"stream": "true"}, stream=True)
+        try:
+            response.raise_for_status()
+        except Exception:
+            response.close()
+            upstream.finish(ticket, ok=True)
+            raise
+        return self._iter_messages(upstream, ticket, response)
+
+    @staticmethod
+    def _iter_messages(upstream, ticket, response):
+        # Rasa's REST channel writes one JSON object per line as each message is produced.
+        ok = False
+        try:
+            with response:
+                for line in response.iter_lines():
+                    if line:
+                        yield json.loads(line)
+            ok = True
+        except GeneratorExit:
+            ok = True
+            raise
+        finally:
+            upstream.finish(ticket, ok)
+
+    def append_events(self, sender, events):
+        """Appends events (e.g. slot updates) to the sender's conversation tracker."""
+        path = f"/conversations/{quote(str(sender), safe='')}/tracker/events"
+        upstream, ticket, response = self._post(sender, lambda u: u.server_url + path,
+                                                json=events, params={"include_events": "NONE"})
+        try:
+            response.raise_for_status()
+        finally:
+            response.close()
+            upstream.finish(ticket, ok=True)
+
+    def close(self):
+        self._closed.set()
+        self.session.close()
+        self._probe_session.close()
@@ -0,0 +1,81 @@
+"""Production entry point: the Flask app under gunicorn with pre-forked workers.
+
+app.py's own `python app.py` runs Werkzeug's single-process debug server and
+is only meant for development. Here the app is imported and warmed up once
+in the gunicorn master (tables and indexes created, the fast-path knowledge
+and the Jinja templates loaded), then forked, so every worker starts with
+all of that already in memory. Each worker opens its own database and Rasa
+connections before it takes traffic, and is replaced after roughly
+WEB_MAX_REQUESTS requests so slow leaks cannot build up.
+
+Requires gunicorn, pinned in requirements.txt:
+
+    pip install -r requirements.txt
+    python serve.py
+
+Settings come from the environment: PORT (5000), WEB_WORKERS (CPU count),
+WEB_THREADS per worker (8), WEB_MAX_REQUESTS (1000, 0 never recycles),
+WEB_MAX_REQUESTS_JITTER (100), WEB_TIMEOUT in seconds (60). The /chat
+admission limits (CHAT_*) and the /metrics counters are per worker.
+"""
+import logging
+import os
+
+from gunicorn.app.base import BaseApplication
+from sqlalchemy import text
+
+from app import app, db, fast_path, init_db, logger, rasa_client
+from structured_logging import log_event
+
+
+def warm_up():
+    """Runs once in the master, before any worker is forked."""
+    with app.app_context():
+        init_db()
+        if fast_path is not None:
+            fast_path.refresh()
+        # Workers must not share the master's SQLite connections.
+        db.engine.dispose()
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+    app.url_map.update()
+
+
+def post_worker_init(worker):
+    """Opens this worker's first database and Rasa connections."""
+    with app.app_context():
+        db.session.execute(text('SELECT 1'))
+    rasa_client.warm_up()
+    log_event(logger, logging.INFO, "worker_ready", pid=os.getpid(),
+              rasa_down=[u.url for u in rasa_client.upstreams if u.state != 'closed'])
+
+
+class WellBotServer(BaseApplication):
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return app
+
+
+if __name__ == '__main__':
+    warm_up()
+    port = int(os.environ.get('PORT', '5000'))
+    workers = int(os.environ.get('WEB_WORKERS', str(os.cpu_count() or 1)))
+    logger.info("Serving WellBot with gunicorn on 0.0.0.0:%d (%d workers)", port, workers)
+    WellBotServer({
+        'bind': f'0.0.0.0:{port}',
+        'workers': workers,
+        'worker_class': 'gthread',
+        'threads': int(os.environ.get('WEB_THREADS', '8')),
+        'preload_app': True,
+        'max_requests': int(os.environ.get('WEB_MAX_REQUESTS', '1000')),
+        'max_requests_jitter': int(os.environ.get('WEB_MAX_REQUESTS_JITTER', '100')),
+        'timeout': int(os.environ.get('WEB_TIMEOUT', '60')),
+        'post_worker_init': post_worker_init,
+    }).run()
@@ -0,0 +1,39 @@
+"""Runs the Flask app on gevent so one worker can have many /chat calls in flight.
+
+With the default threaded server every /chat request holds a thread for the
+whole Rasa round-trip. Under gevent the socket calls made by the shared
+RasaClient yield to other greenlets, so a single process keeps up to
+RASA_POOL_SIZE Rasa requests open at once over kept-alive connections.
+
+Requires the optional `gevent` package:
+
+    pip install gevent
+    python serve_async.py
+"""
+from gevent import monkey
+monkey.patch_all()
+
+import os
+import socket
+
+# Greenlets are cheap, so allow far more concurrent Rasa calls than threads would.
+os.environ.setdefault('RASA_POOL_SIZE', '200')
+
+from gevent.pywsgi import WSGIHandler, WSGIServer
+from app import app, init_db, logger
+
+class NoDelayWSGIHandler(WSGIHandler):
+    """pywsgi writes headers and body separately; without TCP_NODELAY a
+    keep-alive client waits ~40 ms on delayed ACK for every response."""
+
+    def __init__(self, sock, address, server, rfile=None):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        super().__init__(sock, address, server, rfile)
+
+
+if __name__ == '__main__':
+    with app.app_context():
+        init_db()
+    port = int(os.environ.get('PORT', '5000'))
+    logger.info("Serving WellBot with gevent on 0.0.0.0:%d", port)
+    WSGIServer(('0.0.0.0', port), app, handler_class=NoDelayWSGIHandler).serve_forever()
@@ -114,6 +114,98 @@ document.addEventListener('DOMContentLoaded', () => {
         chatbox.scrollTop = chatbox.scrollHeight;
     }
 
+    // Browsers that can read a fetch() body as a stream get replies over /chat/stream.
+    const canStream = !!(window.ReadableStream && window.TextDecoder && window.Response
+        && 'body' in window.Response.prototype);
+
+    /**
+     * Shows an error from a failed chat request; sends the user to log in again if the token is gone.
+     * @param {Response} response
+     */
+    async function showChatError(response) {
+        let data = {};
+        try {
+            data = await response.json();
+        } catch (e) { /* non-JSON error page */ }
+        errorMessage.textContent = data.error || data.msg || 'Error sending message.';
+        if (response.status === 401 || response.status === 422 ) {
+            window.location.href = '/login_page';
+        }
+    }
+
+    /**
+     * Sends a message to /chat and shows the single reply.
+     * @param {string} messageText
+     */
+    async function postMessage(messageText) {
+        const response = await fetch('/chat', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ message: messageText }),
+        });
+
+        if (response.ok) {
+            const data = await response.json();
+            // Pass both bot reply AND original user message so feedback works
+            addMessage('bot', data.reply, messageText);
+        } else {
+            await showChatError(response);
+        }
+    }
+
+    /**
+     * Sends a message to /chat/stream and shows each bot message as soon as its
+     * Server-Sent Event arrives.
+     * @param {string} messageText
+     */
+    async function streamMessage(messageText) {
+        const response = await fetch('/chat/stream', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'text/event-stream',
+            },
+            body: JSON.stringify({ message: messageText }),
+        });
+
+        if (!response.ok) {
+            await showChatError(response);
+            return;
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            // Frames are separated by a blank line: "event: <name>\ndata: <json>\n\n"
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const frame = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let eventName = 'message';
+                let data = '';
+                for (const line of frame.split('\n')) {
+                    if (line.startsWith('event:')) eventName = line.slice(6).trim();
+                    else if (line.startsWith('data:')) data += line.slice(5).trim();
+                }
+                const payload = data ? JSON.parse(data) : {};
+
+                if (eventName === 'message' && payload.text) {
+                    addMessage('bot', payload.text, messageText);
+                } else if (eventName === 'error') {
+                    errorMessage.textContent = payload.error || 'Error sending message.';
+                }
+            }
+        }
+    }
+
     // Handle sending messages
     if (messageForm) {
         messageForm.addEventListener('submit', async (event) => {
@@ -127,24 +219,10 @@ document.addEventListener('DOMContentLoaded', () => {
             userInput.value = ''; // Clear input
 
             try {
-                const response = await fetch('/chat', {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                    },
-                    body: JSON.stringify({ message: messageText }),
-                });
-
-                const data = await response.json();
-
-                if (response.ok) {
-                    // Pass both bot reply AND original user message so feedback works
-                    addMessage('bot', data.reply, messageText); 
+                if (canStream) {
+                    await streamMessage(messageText);
                 } else {
-                    errorMessage.textContent = data.error || data.msg || 'Error sending message.';
-                    if (response.status === 401 || response.status === 422 ) {
-                        window.location.href = '/login_page';
-                    }
+                    await postMessage(messageText);
                 }
             } catch (error) {
                 console.error('Chat error:', error);
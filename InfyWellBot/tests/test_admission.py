@@ -0,0 +1,134 @@
+import threading
+import time
+
+import pytest
+
+import admission
+from admission import AdmissionController, RateLimiter, Rejected
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(admission.time, 'monotonic', clock)
+    return clock
+
+
+def test_bucket_allows_a_burst_then_refills(clock):
+    limiter = RateLimiter(rate=1, burst=2)
+    limiter.take('alice')
+    limiter.take('alice')
+    with pytest.raises(Rejected) as rejected:
+        limiter.take('alice')
+    assert rejected.value.reason == 'rate_limited'
+    assert rejected.value.retry_after == 1
+
+    # Other keys have buckets of their own.
+    limiter.take('bob')
+
+    clock.now += 0.5
+    with pytest.raises(Rejected):
+        limiter.take('alice')
+    clock.now += 0.5
+    limiter.take('alice')
+
+
+def test_retry_after_covers_the_missing_token(clock):
+    limiter = RateLimiter(rate=0.25, burst=1)
+    limiter.take('alice')
+    clock.now += 1
+    with pytest.raises(Rejected) as rejected:
+        limiter.take('alice')
+    assert rejected.value.retry_after == 3
+
+
+def test_refill_stops_at_the_burst_size(clock):
+    limiter = RateLimiter(rate=1, burst=2)
+    limiter.take('alice')
+    clock.now += 3600
+    limiter.take('alice')
+    limiter.take('alice')
+    with pytest.raises(Rejected):
+        limiter.take('alice')
+
+
+def test_zero_rate_disables_the_limit(clock):
+    limiter = RateLimiter(rate=0, burst=1)
+    for _ in range(100):
+        limiter.take('alice')
+
+
+def test_evicted_key_starts_with_a_full_bucket(clock):
+    limiter = RateLimiter(rate=1, burst=1, max_keys=1)
+    limiter.take('alice')
+    limiter.take('bob')
+    limiter.take('alice')
+
+
+def test_slots_are_taken_without_queueing():
+    controller = AdmissionController(max_in_flight=2, max_queue=0, queue_timeout=1)
+    assert controller.acquire() is False
+    assert controller.acquire() is False
+    with pytest.raises(Rejected) as rejected:
+        controller.acquire()
+    assert rejected.value.reason == 'overloaded'
+    controller.release()
+    assert controller.acquire() is False
+
+
+def test_full_queue_rejects_at_once():
+    controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=5)
+    controller.acquire()
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(controller.acquire()))
+    waiter.start()
+    deadline = time.monotonic() + 5
+    while controller.waiting == 0 and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+    with pytest.raises(Rejected) as rejected:
+        controller.acquire()
+    assert rejected.value.reason == 'overloaded'
+
+    controller.release()
+    waiter.join(5)
+    assert results == [True]
+    assert controller.in_flight == 1 and controller.waiting == 0
+
+
+def test_waiter_times_out(clock):
+    controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=2)
+    controller.acquire()
+
+    def wait(timeout):
+        clock.now += timeout
+        return False
+
+    controller._slot_freed.wait = wait
+    with pytest.raises(Rejected) as rejected:
+        controller.acquire()
+    assert rejected.value.reason == 'queue_timeout'
+    assert controller.in_flight == 1 and controller.waiting == 0
+
+
+def test_slot_freed_as_the_wait_times_out_is_taken(clock):
+    controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=2)
+    controller.acquire()
+
+    def wait(timeout):
+        # release() lands just as the timeout fires, so the notify is missed.
+        clock.now += timeout
+        controller.in_flight -= 1
+        return False
+
+    controller._slot_freed.wait = wait
+    assert controller.acquire() is True
+    assert controller.in_flight == 1 and controller.waiting == 0
@@ -0,0 +1,33 @@
+import os
+import tempfile
+
+from werkzeug.datastructures import FileStorage
+
+os.environ.setdefault('WELLBOT_DB_PATH', os.path.join(tempfile.mkdtemp(), 'test.db'))
+
+from app import read_knowledge_csv  # noqa: E402
+
+
+def upload(data):
+    """A file upload as Werkzeug hands it over: backed by a SpooledTemporaryFile."""
+    stream = tempfile.SpooledTemporaryFile(max_size=500 * 1024)
+    stream.write(data)
+    stream.seek(0)
+    return FileStorage(stream=stream, filename='health_knowledge.csv', content_type='text/csv')
+
+
+def test_spooled_upload_is_read():
+    data = (
+        '﻿intent,entity,response_en,response_hi\r\n'
+        'ask_symptom,Cold,"Runny nose,\r\nsneezing.",सर्दी\r\n'
+        'ask_symptom,cold,Again.,फिर\r\n'
+        'ask_weather,rain,Umbrella.,छाता\r\n'
+    ).encode('utf-8')
+    errors = []
+    rows = list(read_knowledge_csv(upload(data).stream, errors))
+
+    assert rows == [{
+        'intent': 'ask_symptom', 'entity': 'cold',
+        'response_en': 'Runny nose,\r\nsneezing.', 'response_hi': 'सर्दी',
+    }]
+    assert errors == [(4, "duplicate of line 3"), (5, "unknown intent 'ask_weather'")]
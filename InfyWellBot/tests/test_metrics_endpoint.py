@@ -0,0 +1,25 @@
+import os
+import tempfile
+
+os.environ.setdefault('WELLBOT_DB_PATH', os.path.join(tempfile.mkdtemp(), 'test.db'))
+
+from app import app  # noqa: E402
+
+REMOTE = {'REMOTE_ADDR': '203.0.113.7'}
+
+
+def test_only_local_clients_without_a_token(monkeypatch):
+    monkeypatch.setitem(app.config, 'METRICS_TOKEN', '')
+    client = app.test_client()
+    assert client.get('/metrics').status_code == 200
+    assert client.get('/metrics', environ_base=REMOTE).status_code == 403
+
+
+def test_token_is_required_when_set(monkeypatch):
+    monkeypatch.setitem(app.config, 'METRICS_TOKEN', 's3cret')
+    client = app.test_client()
+    assert client.get('/metrics').status_code == 403
+    assert client.get('/metrics', environ_base=REMOTE, headers={'Authorization': 'Bearer wrong'}).status_code == 403
+    response = client.get('/metrics', environ_base=REMOTE, headers={'Authorization': 'Bearer s3cret'})
+    assert response.status_code == 200
+    assert b'# TYPE' in response.data
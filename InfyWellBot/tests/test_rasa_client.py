@@ -0,0 +1,147 @@
+import os
+import socket
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'benchmarks')))
+
+import rasa_client  # noqa: E402
+from rasa_client import NoUpstreamAvailable, RasaClient, Upstream  # noqa: E402
+from stub_rasa import serve  # noqa: E402
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rasa_client.time, 'monotonic', clock)
+    return clock
+
+
+@pytest.fixture
+def stubs():
+    servers = [serve(0), serve(0)]
+    for server in servers:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield [f"http://127.0.0.1:{server.server_address[1]}" for server in servers]
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def unused_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def make_client(roots, **kwargs):
+    return RasaClient([root + '/webhooks/rest/webhook' for root in roots], server_url=roots,
+                      health_interval=0, **kwargs)
+
+
+def test_breaker_opens_and_one_trial_closes_it(clock):
+    upstream = Upstream('http://rasa', 'http://rasa', max_failures=2, cooldown=10)
+    upstream.finish(upstream.start(), ok=False)
+    assert upstream.state == 'closed'
+    upstream.finish(upstream.start(), ok=False)
+    assert upstream.state == 'open'
+    assert upstream.start() is None
+
+    clock.now += 10
+    assert upstream.state == 'half-open'
+    trial = upstream.start()
+    assert trial is not None
+    assert upstream.start() is None
+
+    upstream.finish(trial, ok=True)
+    assert upstream.state == 'closed'
+
+
+def test_failed_trial_reopens_the_breaker(clock):
+    upstream = Upstream('http://rasa', 'http://rasa', max_failures=1, cooldown=10)
+    upstream.finish(upstream.start(), ok=False)
+    clock.now += 10
+    upstream.finish(upstream.start(), ok=False)
+    assert upstream.state == 'open'
+
+
+def test_older_request_does_not_end_the_trial(clock):
+    upstream = Upstream('http://rasa', 'http://rasa', max_failures=1, cooldown=10)
+    old = upstream.start()
+    upstream.finish(upstream.start(), ok=False)
+    clock.now += 10
+    trial = upstream.start()
+
+    # The old request fails too: the breaker reopens, but the trial is still running.
+    upstream.finish(old, ok=False)
+    clock.now += 10
+    assert upstream.start() is None
+    upstream.finish(trial, ok=True)
+    assert upstream.state == 'closed'
+
+
+def test_full_pool_turns_requests_away():
+    upstream = Upstream('http://rasa', 'http://rasa', max_in_flight=2)
+    first, second = upstream.start(), upstream.start()
+    assert upstream.start() is None
+    assert not upstream.available()
+    upstream.finish(first, ok=True)
+    assert upstream.start() is not None
+
+
+def test_sender_sticks_to_its_home_upstream(stubs):
+    client = make_client(stubs)
+    homes = {sender: client._candidates(sender)[0] for sender in map(str, range(50))}
+    assert len(set(homes.values())) == 2
+
+    for sender, home in list(homes.items())[:5]:
+        assert client.send(sender, "hi")[0]['recipient_id'] == sender
+        assert client._candidates(sender)[0] is home
+    client.close()
+
+
+def test_busy_home_spills_over_to_the_least_busy_upstream(stubs):
+    client = make_client(stubs, sticky_slack=2)
+    home, other = client._candidates('alice')
+    tickets = [home.start() for _ in range(3)]
+    assert client._candidates('alice')[0] is other
+    for ticket in tickets:
+        home.finish(ticket, ok=True)
+    assert client._candidates('alice')[0] is home
+    client.close()
+
+
+def test_full_home_pool_spills_over_instead_of_waiting(stubs):
+    client = make_client(stubs, pool_size=1)
+    home, other = client._candidates('alice')
+    ticket = home.start()
+    assert client.send('alice', "hi")[0]['recipient_id'] == 'alice'
+    assert other.failures == 0 and other.outstanding == 0
+
+    other_ticket = other.start()
+    with pytest.raises(NoUpstreamAvailable):
+        client.send('alice', "hi")
+    home.finish(ticket, ok=True)
+    other.finish(other_ticket, ok=True)
+    client.close()
+
+
+def test_request_that_never_connected_is_retried_on_the_next_upstream(stubs):
+    dead = f"http://127.0.0.1:{unused_port()}"
+    client = make_client([dead, stubs[0]])
+    sender = next(s for s in map(str, range(100)) if client._candidates(s)[0].server_url == dead)
+
+    assert client.send(sender, "hi")[0]['recipient_id'] == sender
+    down = client.upstreams[0]
+    assert down.failures == 1 and down.outstanding == 0
+    client.close()
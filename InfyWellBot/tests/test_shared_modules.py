@@ -0,0 +1,20 @@
+"""Modules the action server shares with the app.
+
+Each Docker image is built from its own directory, so milestone2_rasa/actions
+keeps a copy of these files. The copies must not drift apart.
+"""
+import filecmp
+import os
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(HERE, '..')
+ACTIONS_DIR = os.path.join(HERE, '..', '..', 'milestone2_rasa', 'actions')
+SHARED_MODULES = ['metrics.py', 'structured_logging.py', 'wellness_summary.py']
+
+
+@pytest.mark.parametrize('name', SHARED_MODULES)
+def test_action_server_copy_is_identical(name):
+    assert filecmp.cmp(os.path.join(APP_DIR, name), os.path.join(ACTIONS_DIR, name), shallow=False), \
+        f"milestone2_rasa/actions/{name} differs from InfyWellBot/{name}; copy the change over"
@@ -0,0 +1,62 @@
+import os
+import tempfile
+
+import pytest
+from sqlalchemy import text
+
+os.environ.setdefault('WELLBOT_DB_PATH', os.path.join(tempfile.mkdtemp(), 'test.db'))
+
+from app import app, db, init_db, with_rolling_summary  # noqa: E402
+
+PASSWORD = 'test-password-123'
+
+
+@pytest.fixture
+def client():
+    with app.app_context():
+        db.drop_all()
+        init_db()
+        # Wellness rows whose CSV UserID happens to equal the account id.
+        db.session.execute(text("INSERT INTO user_wellness_rolling (UserID, Date, Steps_7d, Days_7d, Days_30d) "
+                                "VALUES ('1', '2024-01-07', 9000, 7, 7), ('W-17', '2024-01-07', 4000, 7, 7)"))
+        db.session.commit()
+    return app.test_client()
+
+
+def login(client, email):
+    client.post('/register', json={"email": email, "password": PASSWORD})
+    token = client.post('/login', json={"email": email, "password": PASSWORD}).get_json()['access_token']
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_unlinked_account_sees_no_wellness_data(client):
+    auth = login(client, 'first@example.com')
+
+    assert client.get('/wellness/me/rolling', headers=auth).status_code == 404
+    assert client.get('/wellness/me/series', headers=auth).status_code == 404
+    with app.app_context():
+        assert with_rolling_summary('1', "Tip.", 'en') == "Tip."
+
+
+def test_linked_account_sees_its_own_rows(client):
+    auth = login(client, 'first@example.com')
+    with client.session_transaction() as session:
+        session['admin_logged_in'] = True
+
+    response = client.put('/admin/api/users/1/wellness_user_id', json={"wellness_user_id": "W-17"})
+    assert response.get_json()['wellness_user_id'] == 'W-17'
+
+    assert client.get('/wellness/me/rolling', headers=auth).get_json()['Steps_7d'] == 4000
+    with app.app_context():
+        assert "4,000 steps/day" in with_rolling_summary('1', "Tip.", 'en')
+
+
+def test_wellness_user_id_links_one_account(client):
+    login(client, 'first@example.com')
+    login(client, 'second@example.com')
+    with client.session_transaction() as session:
+        session['admin_logged_in'] = True
+
+    assert client.put('/admin/api/users/1/wellness_user_id', json={"wellness_user_id": "W-17"}).status_code == 200
+    assert client.put('/admin/api/users/2/wellness_user_id', json={"wellness_user_id": "W-17"}).status_code == 409
+    assert client.put('/admin/api/users/9/wellness_user_id', json={"wellness_user_id": "W-9"}).status_code == 404
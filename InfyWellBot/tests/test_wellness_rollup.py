@@ -0,0 +1,48 @@
+import os
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine
+
+os.environ.setdefault('WELLBOT_DB_PATH', os.path.join(tempfile.mkdtemp(), 'test.db'))
+
+import load_db  # noqa: E402
+
+
+def write_csv(path, steps):
+    with open(path, 'w') as f:
+        f.write("UserID,Date,Steps,SleepHours\n")
+        for day, count in enumerate(steps, start=1):
+            f.write(f"u1,2024-01-{day:02d},{count},7\n")
+
+
+def steps_7d(engine, date):
+    with engine.connect() as conn:
+        return conn.exec_driver_sql(
+            "SELECT Steps_7d FROM user_wellness_rolling WHERE UserID = 'u1' AND Date = ?", (date,)
+        ).scalar()
+
+
+def test_rerun_refreshes_days_committed_by_a_failed_load(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'wellness.db'}")
+    csv_path = str(tmp_path / 'wellness.csv')
+    write_csv(csv_path, [1000, 1000, 1000, 1000])
+    load_db.load_csv(engine, csv_path, chunk_rows=2)
+    assert steps_7d(engine, '2024-01-04') == 1000
+
+    write_csv(csv_path, [1000, 1000, 5000, 5000])
+
+    def fail(conn, full=False):
+        raise RuntimeError("killed before the refresh")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(load_db, 'refresh_rolling', fail)
+        with pytest.raises(RuntimeError):
+            load_db.load_csv(engine, csv_path, chunk_rows=2)
+    # The re-run is a new process: the failed load's connection is gone.
+    engine.dispose()
+
+    # The changed days are committed; the re-run's upsert writes nothing.
+    stats = load_db.load_csv(engine, csv_path, chunk_rows=2)
+    assert stats['rows_written'] == 0
+    assert steps_7d(engine, '2024-01-04') == 3000
@@ -0,0 +1,36 @@
+import logging
+
+from write_behind import WriteBehindQueue
+
+
+def test_failed_flush_is_retried():
+    written, attempts = [], []
+
+    def flush(batch):
+        attempts.append(list(batch))
+        if len(attempts) == 1:
+            raise RuntimeError("database is locked")
+        written.extend(batch)
+
+    writer = WriteBehindQueue(flush, max_delay_ms=10, retry_delay_ms=1, name='test-writer')
+    writer.put({"id": 1})
+    writer.put({"id": 2})
+    writer.close()
+
+    assert len(attempts) == 2
+    assert written == [{"id": 1}, {"id": 2}]
+
+
+def test_batch_is_logged_when_retries_run_out(caplog):
+    def flush(batch):
+        raise RuntimeError("database is locked")
+
+    writer = WriteBehindQueue(flush, max_delay_ms=10, max_retries=2, retry_delay_ms=1, name='test-writer')
+    writer.put({"comment": "keep me"})
+    with caplog.at_level(logging.WARNING, logger='wellbot.write_behind'):
+        writer.close()
+
+    dropped = [r for r in caplog.records if r.levelno == logging.ERROR]
+    assert len(dropped) == 1
+    assert "after 3 attempts" in dropped[0].getMessage()
+    assert '"keep me"' in dropped[0].getMessage()
@@ -1,17 +1,35 @@
+import os
+import uuid
+
 import streamlit as st
 import requests
-import random
+
+from rasa_client import RasaClient
+from structured_logging import get_logger
 
 # --- Config ---
-RASA_API_URL = "http://localhost:5005/webhooks/rest/webhook"
+RASA_API_URL = os.environ.get("RASA_API_URL", "http://localhost:5005/webhooks/rest/webhook")
 BOT_AVATAR = "🤖"
 USER_AVATAR = "🙂"
 
+logger = get_logger('wellbot.ui')
+
 st.set_page_config(page_title="Wellness Chatbot", page_icon=BOT_AVATAR)
 st.title("Wellness Chatbot")
 st.caption("Your non-diagnostic health assistant 🩺")
 
+# --- Shared Rasa Client ---
+@st.cache_resource
+def get_rasa_client():
+    """One pooled keep-alive HTTP session for every browser session of this server."""
+    return RasaClient(url=RASA_API_URL)
+
 # --- Session State ---
+# One Rasa conversation (tracker) per browser session, so context carries over
+# between messages and a user does not spread over many trackers.
+if "sender_id" not in st.session_state:
+    st.session_state.sender_id = uuid.uuid4().hex
+
 # Initialize chat history
 if "messages" not in st.session_state:
     st.session_state.messages = [
@@ -19,23 +37,24 @@ if "messages" not in st.session_state:
     ]
 
 # --- Helper Function ---
-def get_rasa_response(message):
-    """Send message to Rasa and get a response."""
+def get_rasa_responses(message):
+    """Send message to Rasa and return all of its replies as a list of texts."""
     try:
-        payload = {"sender": str(random.randint(1, 1000)), "message": message}
-        response = requests.post(RASA_API_URL, json=payload)
-        response.raise_for_status() # Raise an exception for bad status codes
-        
-        rasa_responses = response.json()
-        if rasa_responses:
-            # Return the text from the first response
-            return rasa_responses[0].get("text", "Sorry, I didn't understand that.")
-        return "I'm not sure how to respond to that."
+        rasa_responses = get_rasa_client().send(st.session_state.sender_id, message)
+        replies = []
+        for r in rasa_responses:
+            if r.get("text"):
+                replies.append(r["text"])
+            if r.get("image"):
+                replies.append(f"![image]({r['image']})")
+        return replies or ["I'm not sure how to respond to that."]
     except requests.exceptions.ConnectionError:
-        return "Error: Could not connect to the Rasa server. Are both Rasa servers running?"
-    except Exception as e:
-        print(f"Rasa API Error: {e}")
-        return "Sorry, I'm having technical difficulties."
+        return ["Error: Could not connect to the Rasa server. Are both Rasa servers running?"]
+    except requests.exceptions.Timeout:
+        return ["Sorry, the chatbot server took too long to respond."]
+    except Exception:
+        logger.exception("Rasa API error")
+        return ["Sorry, I'm having technical difficulties."]
 
 # --- Chat Interface ---
 
@@ -53,12 +72,12 @@ if prompt := st.chat_input("What's up?"):
     with st.chat_message("user", avatar=USER_AVATAR):
         st.markdown(prompt)
 
-    # 3. Get bot response
+    # 3. Get bot responses (one request, however many messages Rasa sends back)
     with st.spinner("Thinking..."):
-        bot_response = get_rasa_response(prompt)
-    
-    # 4. Add bot response to history
-    st.session_state.messages.append({"role": "assistant", "content": bot_response})
-    # 5. Display bot response
-    with st.chat_message("assistant", avatar=BOT_AVATAR):
-        st.markdown(bot_response)
\ No newline at end of file
+        bot_responses = get_rasa_responses(prompt)
+
+    # 4. Add each bot response to history and display it
+    for bot_response in bot_responses:
+        st.session_state.messages.append({"role": "assistant", "content": bot_response})
+        with st.chat_message("assistant", avatar=BOT_AVATAR):
+            st.markdown(bot_response)
@@ -0,0 +1,157 @@
+"""Per-user 7- and 30-day rolling wellness averages.
+
+user_wellness_rolling holds, for every (UserID, Date) in user_wellness_data,
+the mean steps, sleep, calorie balance (intake - burned) and water intake
+over the 7 and 30 calendar days ending on that date, plus how many days in
+each window had data. Days without a value are skipped, not counted as zero.
+
+load_db.py keeps the table current. track_changes() adds a temporary trigger
+to the loader's own connection that records every (UserID, Date) the upsert
+actually inserts or changes in wellness_dirty, committed with the chunk that
+wrote it; refresh_rolling() then recomputes only the windows those dates
+fall into (a changed day affects itself and the next 29 days) with pandas'
+grouped time-based rolling windows, upserts the result and empties
+wellness_dirty in the same transaction. A load that dies between the two
+leaves its dates in wellness_dirty for the next refresh.
+
+The read helpers are in wellness_summary.py, which the action server shares.
+"""
+import time
+
+import pandas as pd
+
+from wellness_summary import COLUMNS, METRICS, TABLE_NAME, WINDOWS
+
+SOURCE_TABLE = 'user_wellness_data'
+MAX_WINDOW = max(WINDOWS)
+# Changed-date ranges recomputed per pass; bounds the frame held in memory.
+RANGES_PER_PASS = 2000
+
+# Dates written but not yet refreshed. A real table, so the log outlives a
+# failed load: a re-run's upsert skips the unchanged rows and would not
+# record them again.
+DIRTY_TABLE = 'wellness_dirty'
+CREATE_DIRTY_SQL = f"CREATE TABLE IF NOT EXISTS {DIRTY_TABLE} (UserID TEXT, Date TEXT, PRIMARY KEY (UserID, Date))"
+# Connection-local TEMP table.
+RANGES_TABLE = 'wellness_rolling_ranges'
+
+UPSERT_SQL = (
+    f"INSERT INTO {TABLE_NAME} ({', '.join(COLUMNS)}) VALUES ({', '.join('?' for _ in COLUMNS)}) "
+    f"ON CONFLICT(UserID, Date) DO UPDATE SET "
+    + ", ".join(f"{c} = excluded.{c}" for c in COLUMNS[2:])
+)
+
+
+def track_changes(cursor):
+    """Records (UserID, Date) of every row written to user_wellness_data on this connection."""
+    cursor.execute(CREATE_DIRTY_SQL)
+    for operation in ('INSERT', 'UPDATE'):
+        cursor.execute(
+            f"CREATE TEMP TRIGGER IF NOT EXISTS wellness_dirty_{operation.lower()} "
+            f"AFTER {operation} ON main.{SOURCE_TABLE} BEGIN "
+            f"INSERT OR IGNORE INTO {DIRTY_TABLE} (UserID, Date) VALUES (NEW.UserID, NEW.Date); END"
+        )
+
+
+def _changed_ranges(dirty):
+    """Merges changed dates into per-user (lo, hi) output ranges.
+
+    A change on day d alters the windows ending on d .. d+29. Changes closer
+    than that share one range, so ranges of the same user never overlap.
+    """
+    if dirty.empty:
+        return pd.DataFrame({'UserID': [], 'lo': pd.to_datetime([]), 'hi': pd.to_datetime([])})
+    dirty = dirty.sort_values(['UserID', 'Date'], ignore_index=True)
+    gap = pd.Timedelta(days=MAX_WINDOW - 1)
+    starts = (dirty['UserID'] != dirty['UserID'].shift()) | (dirty['Date'].diff() > gap)
+    ranges = dirty.groupby(starts.cumsum()).agg(UserID=('UserID', 'first'), lo=('Date', 'min'), hi=('Date', 'max'))
+    ranges['hi'] += gap
+    return ranges
+
+
+def compute_rolling(frame):
+    """Rolling means and day counts for rows sorted by (range_id, Date).
+
+    `frame` has range_id, UserID, Date (datetime64) and the raw wellness
+    columns; returns a frame with COLUMNS aligned to it.
+    """
+    values = pd.DataFrame({
+        'range_id': frame['range_id'].to_numpy(),
+        'Steps': frame['Steps'].astype('float64').to_numpy(),
+        'SleepHours': frame['SleepHours'].astype('float64').to_numpy(),
+        'CalorieBalance': (frame['CaloriesIntake'].astype('float64')
+                           - frame['CaloriesBurned'].astype('float64')).to_numpy(),
+        'WaterIntake_L': frame['WaterIntake_L'].astype('float64').to_numpy(),
+        'Days': 1.0,
+    }, index=pd.DatetimeIndex(frame['Date'], name='Date'))
+    grouped = values.groupby('range_id', sort=False)[METRICS + ['Days']]
+
+    result = pd.DataFrame({'UserID': frame['UserID'].to_numpy(),
+                           'Date': frame['Date'].dt.strftime('%Y-%m-%d').to_numpy()})
+    for days in WINDOWS:
+        window = grouped.rolling(f'{days}D', min_periods=1)
+        means = window[METRICS].mean()
+        for metric in METRICS:
+            result[f"{metric}_{days}d"] = means[metric].round(3).to_numpy()
+        result[f"Days_{days}d"] = window['Days'].count().to_numpy().astype('int64')
+    return result[COLUMNS]
+
+
+def refresh_rolling(conn, full=False):
+    """Recomputes the rolling rows affected by the dates in the change log.
+
+    The log holds every date recorded by track_changes() since the last
+    successful refresh, from this load and any earlier one that failed.
+    `conn` is a sqlite3 connection; with full=True every user's whole
+    history is rebuilt instead. Clears the change log in the same commit as
+    the rolling rows. Returns a dict of refresh statistics.
+    """
+    started = time.perf_counter()
+    cursor = conn.cursor()
+    cursor.execute(CREATE_DIRTY_SQL)
+    if full:
+        cursor.execute(f"DELETE FROM {TABLE_NAME}")
+        ranges = pd.read_sql_query(
+            f"SELECT UserID, MIN(Date) AS lo, MAX(Date) AS hi FROM {SOURCE_TABLE} GROUP BY UserID", conn)
+        ranges['lo'], ranges['hi'] = pd.to_datetime(ranges['lo']), pd.to_datetime(ranges['hi'])
+    else:
+        dirty = pd.read_sql_query(f"SELECT UserID, Date FROM {DIRTY_TABLE}", conn)
+        dirty['Date'] = pd.to_datetime(dirty['Date'])
+        ranges = _changed_ranges(dirty)
+
+    written = 0
+    if len(ranges):
+        cursor.execute(f"DROP TABLE IF EXISTS {RANGES_TABLE}")
+        cursor.execute(f"CREATE TEMP TABLE {RANGES_TABLE} (id INTEGER PRIMARY KEY, UserID TEXT, lo TEXT, hi TEXT)")
+        cursor.executemany(
+            f"INSERT INTO {RANGES_TABLE} (UserID, lo, hi) VALUES (?, ?, ?)",
+            zip(ranges['UserID'], ranges['lo'].dt.strftime('%Y-%m-%d'), ranges['hi'].dt.strftime('%Y-%m-%d'))
+        )
+        for first in range(1, len(ranges) + 1, RANGES_PER_PASS):
+            # Each range reads 29 days of history before its first changed date
+            # through the (UserID, Date) primary key.
+            frame = pd.read_sql_query(
+                f"SELECT r.id AS range_id, r.lo, w.UserID, w.Date, w.Steps, w.SleepHours, "
+                f"w.CaloriesIntake, w.CaloriesBurned, w.WaterIntake_L "
+                f"FROM {RANGES_TABLE} r JOIN {SOURCE_TABLE} w ON w.UserID = r.UserID "
+                f"AND w.Date BETWEEN date(r.lo, '-{MAX_WINDOW - 1} days') AND r.hi "
+                f"WHERE r.id BETWEEN ? AND ? ORDER BY r.id, w.Date",
+                conn, params=(first, first + RANGES_PER_PASS - 1)
+            )
+            if frame.empty:
+                continue
+            frame['Date'] = pd.to_datetime(frame['Date'])
+            rolling = compute_rolling(frame)
+            rolling = rolling[(frame['Date'] >= pd.to_datetime(frame['lo'])).to_numpy()]
+            rolling = rolling.astype(object).where(rolling.notna(), None)
+            cursor.executemany(UPSERT_SQL, rolling.itertuples(index=False, name=None))
+            written += len(rolling)
+        cursor.execute(f"DROP TABLE {RANGES_TABLE}")
+    cursor.execute(f"DELETE FROM {DIRTY_TABLE}")
+    conn.commit()
+    return {
+        "users": int(ranges['UserID'].nunique()) if len(ranges) else 0,
+        "ranges": len(ranges),
+        "rows_written": written,
+        "seconds": time.perf_counter() - started,
+    }
@@ -0,0 +1,102 @@
+import atexit
+import json
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger('wellbot.write_behind')
+
+
+class WriteBehindQueue:
+    """Bounded in-process queue that hands records to `flush` in batches.
+
+    A background thread calls flush(records) when max_batch records are
+    waiting or max_delay_ms has passed since the first one arrived, so many
+    small writes become one transaction. put() raises queue.Full once the
+    queue holds max_size records (after waiting up to `timeout`), which lets
+    the caller shed load instead of growing memory. Remaining records are
+    flushed when close() runs, which is registered with atexit.
+
+    A batch whose flush raises (e.g. "database is locked") is retried up to
+    max_retries times, waiting retry_delay_ms and doubling the wait each
+    time. Only then is it dropped, and its records are logged as JSON so
+    they can be recovered by hand.
+    """
+
+    def __init__(self, flush, max_batch=100, max_delay_ms=200, max_size=10000, name='write-behind',
+                 max_retries=3, retry_delay_ms=100):
+        self._flush = flush
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000.0
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay_ms / 1000.0
+        self.name = name
+        self._queue = queue.Queue(maxsize=max_size)
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        atexit.register(self.close)
+
+    def _ensure_started(self):
+        # Started lazily so a pre-forking server gets one writer per worker process.
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                    self._thread.start()
+
+    def put(self, record, timeout=0.5):
+        if self._stopping.is_set():
+            raise RuntimeError(f"{self.name} is shutting down")
+        self._ensure_started()
+        self._queue.put(record, timeout=timeout)
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def _collect(self):
+        try:
+            batch = [self._queue.get(timeout=self.max_delay)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = 0 if self._stopping.is_set() else deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = self._collect()
+            if not batch:
+                continue
+            self._write(batch)
+
+    def _write(self, batch):
+        delay = self.retry_delay
+        for attempt in range(1, self.max_retries + 2):
+            try:
+                self._flush(batch)
+                return
+            except Exception:
+                if attempt > self.max_retries:
+                    logger.exception("%s: dropped %d records after %d attempts; records: %s", self.name,
+                                     len(batch), attempt, json.dumps(batch, default=str, ensure_ascii=False))
+                    return
+                logger.warning("%s: writing %d records failed (attempt %d), retrying in %.2fs",
+                               self.name, len(batch), attempt, delay, exc_info=True)
+            time.sleep(delay)
+            delay *= 2
+
+    def close(self, timeout=10.0):
+        """Stops accepting records and waits for everything queued to be written."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        elif not self._queue.empty():
+            # Never started in this process; drain synchronously.
+            self._run()
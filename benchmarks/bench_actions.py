@@ -0,0 +1,146 @@
+"""Micro-benchmark for ActionQueryKnowledgeBase.run, fully offline.
+
+Builds a throwaway project.db from InfyWellBot/health_knowledge.csv (plus
+optional synthetic rows), then calls the action directly with a fake tracker
+and dispatcher for a few representative turns. Needs rasa_sdk importable,
+like the action server itself.
+
+    python benchmarks/bench_actions.py --iterations 5000 --extra-entities 50000 \\
+        --output action-results.json
+"""
+import argparse
+import contextlib
+import csv
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from common import summarize, write_report
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RASA_DIR = os.path.join(HERE, '..', 'milestone2_rasa')
+KNOWLEDGE_CSV = os.path.join(HERE, '..', 'InfyWellBot', 'health_knowledge.csv')
+
+
+class FakeTracker:
+    """The parts of rasa_sdk.Tracker the action reads."""
+
+    def __init__(self, intent, entity=None, language='en', events=None, slots=None):
+        entities = [{"entity": "condition", "value": entity}] if entity else []
+        self.sender_id = 'bench'
+        self.latest_message = {
+            "intent": {"name": intent},
+            "entities": entities,
+            "metadata": {"user_language": language},
+            "text": f"{intent} {entity or ''}",
+        }
+        self.events = events or []
+        self.slots = slots or {}
+
+    def get_slot(self, name):
+        return self.slots.get(name)
+
+
+class FakeDispatcher:
+    def __init__(self):
+        self.messages = []
+
+    def utter_message(self, text=None, response=None, **kwargs):
+        self.messages.append(text or response)
+
+
+def user_event(intent):
+    return {"event": "user", "parse_data": {"intent": {"name": intent}}}
+
+
+def build_database(path, extra_entities):
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE health_knowledge (id INTEGER PRIMARY KEY AUTOINCREMENT, intent VARCHAR(100) NOT NULL, "
+        "entity VARCHAR(100) NOT NULL, response_en TEXT NOT NULL, response_hi TEXT NOT NULL)"
+    )
+    conn.execute("CREATE UNIQUE INDEX ix_health_knowledge_intent_entity ON health_knowledge (intent, entity)")
+    conn.execute("CREATE TABLE kb_version (id INTEGER PRIMARY KEY, version INTEGER NOT NULL)")
+    with open(KNOWLEDGE_CSV, newline='', encoding='utf-8') as f:
+        rows = [(r['intent'], r['entity'].lower(), r['response_en'], r['response_hi']) for r in csv.DictReader(f)]
+    intents = ['ask_symptom', 'ask_first_aid', 'ask_wellness_tip', 'ask_prevention']
+    rows += [
+        (intents[i % len(intents)], f"synthetic condition {i}", f"English tip {i}", f"Hindi tip {i}")
+        for i in range(extra_entities)
+    ]
+    conn.executemany(
+        "INSERT INTO health_knowledge (intent, entity, response_en, response_hi) VALUES (?, ?, ?, ?)", rows
+    )
+    conn.commit()
+    conn.close()
+    return len(rows)
+
+
+def scenarios(history_lengths):
+    cases = [
+        ("exact match (ask_symptom/flu, en)", lambda: FakeTracker('ask_symptom', 'flu')),
+        ("exact match (ask_symptom/flu, hi)", lambda: FakeTracker('ask_symptom', 'flu', 'hi')),
+        ("wellness fallback (ask_first_aid/sleep)", lambda: FakeTracker('ask_first_aid', 'sleep')),
+        ("fuzzy entity (ask_symptom/migrane)", lambda: FakeTracker('ask_symptom', 'migrane')),
+        ("default fallback (ask_symptom/unknown)", lambda: FakeTracker('ask_symptom', 'no such thing')),
+        ("missing entity (ask_symptom)", lambda: FakeTracker('ask_symptom')),
+    ]
+    for length in history_lengths:
+        # The ask_* turn is the oldest event; the action should only read the slot it set.
+        events = [user_event('ask_symptom')] + [{"event": "bot", "text": "..."}] * (length - 2) + [user_event('inform')]
+        cases.append((
+            f"inform with {length}-event history",
+            lambda events=events: FakeTracker('inform', 'flu', events=events,
+                                              slots={"last_knowledge_intent": "ask_symptom"}),
+        ))
+    return cases
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ActionQueryKnowledgeBase.run with fakes")
+    parser.add_argument('--iterations', type=int, default=2000, help="Calls per scenario")
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--extra-entities', type=int, default=0,
+                        help="Synthetic knowledge rows added on top of health_knowledge.csv")
+    parser.add_argument('--history', default='10,500', help="Comma-separated event-history lengths for inform turns")
+    parser.add_argument('--output', default=None, help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='wellbot-bench-') as tmp:
+        db_path = os.path.join(tmp, 'project.db')
+        total_rows = build_database(db_path, args.extra_entities)
+        os.environ['WELLBOT_DB_PATH'] = db_path
+        os.environ.setdefault('ACTION_METRICS_PORT', '0')
+        sys.path.insert(0, os.path.abspath(RASA_DIR))
+
+        # The per-turn log record stays inside the timing (at the configured
+        # LOG_LEVEL) but goes to /dev/null: the log handler binds stdout on import.
+        # Left open: the listener thread may still be writing at interpreter exit.
+        devnull = open(os.devnull, 'w')
+        with contextlib.redirect_stdout(devnull):
+            from actions.actions import ActionQueryKnowledgeBase
+
+            action = ActionQueryKnowledgeBase()
+            results = []
+            for name, make_tracker in scenarios([int(h) for h in args.history.split(',')]):
+                for _ in range(args.warmup):
+                    action.run(FakeDispatcher(), make_tracker(), {})
+                trackers = [make_tracker() for _ in range(args.iterations)]
+                latencies = []
+                started = time.perf_counter()
+                for tracker in trackers:
+                    dispatcher = FakeDispatcher()
+                    t0 = time.perf_counter()
+                    action.run(dispatcher, tracker, {})
+                    latencies.append(time.perf_counter() - t0)
+                elapsed = time.perf_counter() - started
+                results.append(summarize(name, latencies, elapsed, 0))
+
+    config = {"iterations": args.iterations, "knowledge_rows": total_rows, "history": args.history}
+    write_report("actions", config, results, args.output)
+
+
+if __name__ == '__main__':
+    main()
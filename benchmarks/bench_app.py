@@ -0,0 +1,293 @@
+"""Offline load test for the Flask app.
+
+Starts stub_rasa.py and the Flask app (on a throwaway SQLite file) as
+subprocesses, then drives /register, /login, /chat, /chat/stream, /feedback
+and /admin/dashboard at each concurrency level and reports requests/second and
+p50/p95/p99 latency as JSON. Requests the app sheds with 429/503 (rate limit,
+admission control) are reported as "shed", apart from errors.
+
+    python benchmarks/bench_app.py --concurrency 1,8,32 --requests 400 \\
+        --rasa-latency-ms 50 --output app-results.json
+
+--base-url targets an app that is already running instead (it must point at
+a Rasa or stub of your choosing); add --admin-email/--admin-password there to
+include /admin/dashboard.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import requests
+
+from common import summarize, wait_for_port, write_report
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(HERE, '..', 'InfyWellBot')
+PASSWORD = 'bench-password-123'
+CHAT_MESSAGES = [
+    "what are the symptoms of flu?",
+    "first aid for a minor burn",
+    "tips for better sleep",
+    "how to prevent back pain",
+]
+
+APP_COMMANDS = {
+    'threaded': [sys.executable, '-c', (
+        "import os\n"
+        "from app import app, init_db\n"
+        "with app.app_context(): init_db()\n"
+        "app.run(host='127.0.0.1', port=int(os.environ['PORT']), threaded=True)\n"
+    )],
+    'gevent': [sys.executable, 'serve_async.py'],
+}
+
+# What send() returns for a request the app shed on purpose.
+SHED = 'shed'
+
+
+def outcome(response, ok):
+    """ok, or SHED for a 429/503 from the /chat rate limit or admission control."""
+    if response.status_code in (429, 503) and 'Retry-After' in response.headers:
+        return SHED
+    return ok
+
+
+def run_load(name, concurrency, total, prepare, send, warmup):
+    """Sends `total` requests from `concurrency` threads, each with its own keep-alive session.
+
+    send() returns whether the request succeeded, or (ok, seconds) to report
+    its own latency instead of the whole call (e.g. time to first message).
+    ok may be SHED: those requests are counted apart and left out of the
+    latencies and requests/second, which only cover requests that were served.
+    """
+    latencies, errors, shed = [], [0], [0]
+    lock = threading.Lock()
+    issued = [0]
+    ready = threading.Barrier(concurrency + 1)
+
+    def worker():
+        session = requests.Session()
+        prepare(session)
+        for i in range(warmup):
+            send(session, f"warmup-{i}")
+        ready.wait()
+        while True:
+            with lock:
+                if issued[0] >= total:
+                    return
+                issued[0] += 1
+                n = issued[0]
+            started = time.perf_counter()
+            try:
+                ok = send(session, n)
+            except requests.RequestException:
+                ok = False
+            took = time.perf_counter() - started
+            if isinstance(ok, tuple):
+                ok, took = ok
+            with lock:
+                if ok == SHED:
+                    shed[0] += 1
+                    continue
+                latencies.append(took)
+                if not ok:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    # The clock starts once every worker has finished its untimed warm-up.
+    ready.wait()
+    started = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    return summarize(name, latencies, elapsed, errors[0], concurrency=concurrency, shed=shed[0])
+
+
+def build_scenarios(base_url, user_email, token, admin_cookies):
+    auth = {"Authorization": f"Bearer {token}"}
+
+    def no_setup(session):
+        pass
+
+    def with_admin(session):
+        session.cookies.update(admin_cookies)
+
+    def register(session, n):
+        email = f"bench-{uuid.uuid4().hex}-{n}@example.com"
+        return session.post(f"{base_url}/register", json={"email": email, "password": PASSWORD}).status_code == 201
+
+    def login(session, n):
+        return session.post(f"{base_url}/login", json={"email": user_email, "password": PASSWORD}).ok
+
+    def chat(session, n):
+        message = CHAT_MESSAGES[hash(n) % len(CHAT_MESSAGES)]
+        response = session.post(f"{base_url}/chat", json={"message": message}, headers=auth)
+        return outcome(response, response.ok)
+
+    def chat_stream(session, n, first_only=False):
+        message = CHAT_MESSAGES[hash(n) % len(CHAT_MESSAGES)]
+        started = time.perf_counter()
+        first = None
+        with session.post(f"{base_url}/chat/stream", json={"message": message}, headers=auth,
+                          stream=True) as response:
+            for line in response.iter_lines():
+                if first is None and line == b'event: message':
+                    first = time.perf_counter() - started
+            ok = outcome(response, response.ok and first is not None)
+        return (ok, first or 0.0) if first_only else ok
+
+    def chat_stream_first(session, n):
+        return chat_stream(session, n, first_only=True)
+
+    def feedback(session, n):
+        return session.post(f"{base_url}/feedback", headers=auth, json={
+            "user_message": "bench message", "bot_response": "bench reply",
+            "rating": "good" if hash(n) % 4 else "bad", "comment": ""
+        }).ok
+
+    def dashboard(session, n):
+        return session.get(f"{base_url}/admin/dashboard", allow_redirects=False).status_code == 200
+
+    scenarios = [
+        ("POST /register", no_setup, register),
+        ("POST /login", no_setup, login),
+        ("POST /chat", no_setup, chat),
+        ("POST /chat/stream", no_setup, chat_stream),
+        ("POST /chat/stream first message", no_setup, chat_stream_first),
+        ("POST /feedback", no_setup, feedback),
+    ]
+    if admin_cookies is not None:
+        scenarios.append(("GET /admin/dashboard", with_admin, dashboard))
+    return scenarios
+
+
+def fast_path_stats(base_url):
+    """Hit/miss counts of the /chat fast path, read from the app's /metrics.
+
+    An app on another host needs its METRICS_TOKEN in this environment.
+    """
+    counts = {}
+    token = os.environ.get('METRICS_TOKEN')
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    try:
+        text = requests.get(f"{base_url}/metrics", headers=headers, timeout=5).text
+    except requests.RequestException:
+        return None
+    for line in text.splitlines():
+        if line.startswith('wellbot_chat_fast_path_total{'):
+            result = line.split('result="', 1)[1].split('"', 1)[0]
+            counts[result] = float(line.rsplit(' ', 1)[1])
+    total = sum(counts.values())
+    if not total:
+        return None
+    return {"hits": counts.get('hit', 0), "misses": counts.get('miss', 0),
+            "hit_rate": round(counts.get('hit', 0) / total, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test for the WellBot Flask app")
+    parser.add_argument('--concurrency', default='1,8,32', help="Comma-separated client thread counts")
+    parser.add_argument('--requests', type=int, default=200, help="Requests per endpoint per concurrency level")
+    parser.add_argument('--warmup', type=int, default=2, help="Untimed requests per client thread")
+    parser.add_argument('--rasa-latency-ms', type=float, default=50.0, help="Stub delay per bot message")
+    parser.add_argument('--rasa-messages', type=int, default=1, help="Bot messages per stub reply")
+    parser.add_argument('--rasa-port', type=int, default=5905)
+    parser.add_argument('--app-port', type=int, default=5900)
+    parser.add_argument('--server', choices=sorted(APP_COMMANDS), default='threaded',
+                        help="How to run the app when --base-url is not given")
+    parser.add_argument('--fast-path', action='store_true',
+                        help="Load health_knowledge.csv and run the app with CHAT_FAST_PATH=1")
+    parser.add_argument('--endpoints', default=None,
+                        help="Comma-separated subset, e.g. '/chat,/feedback'")
+    parser.add_argument('--base-url', default=None, help="Benchmark an already running app")
+    parser.add_argument('--admin-email', default=None)
+    parser.add_argument('--admin-password', default=None)
+    parser.add_argument('--output', default=None, help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    levels = [int(c) for c in args.concurrency.split(',')]
+    processes = []
+    tmpdir = tempfile.TemporaryDirectory(prefix='wellbot-bench-')
+    try:
+        if args.base_url:
+            base_url = args.base_url.rstrip('/')
+        else:
+            processes.append(subprocess.Popen(
+                [sys.executable, os.path.join(HERE, 'stub_rasa.py'), '--port', str(args.rasa_port),
+                 '--latency-ms', str(args.rasa_latency_ms), '--messages', str(args.rasa_messages)],
+                stdout=subprocess.DEVNULL
+            ))
+            env = dict(
+                os.environ,
+                WELLBOT_DB_PATH=os.path.join(tmpdir.name, 'bench.db'),
+                RASA_API_URL=f"http://127.0.0.1:{args.rasa_port}/webhooks/rest/webhook",
+                PORT=str(args.app_port),
+                CHAT_FAST_PATH='1' if args.fast_path else '0',
+                # Every request comes from the same user; do not measure the per-user limit.
+                CHAT_USER_RATE='0',
+            )
+            if args.fast_path:
+                subprocess.run([sys.executable, 'load_knowledge.py', 'health_knowledge.csv'],
+                               cwd=APP_DIR, env=env, check=True, stdout=subprocess.DEVNULL)
+            processes.append(subprocess.Popen(
+                APP_COMMANDS[args.server], cwd=APP_DIR, env=env,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            ))
+            wait_for_port('127.0.0.1', args.rasa_port)
+            wait_for_port('127.0.0.1', args.app_port)
+            base_url = f"http://127.0.0.1:{args.app_port}"
+
+        setup = requests.Session()
+        admin_email, admin_password = args.admin_email, args.admin_password
+        if not args.base_url:
+            # On a fresh database the first registered user becomes the admin.
+            admin_email, admin_password = 'bench-admin@example.com', PASSWORD
+            setup.post(f"{base_url}/register", json={"email": admin_email, "password": admin_password})
+
+        user_email = f"bench-user-{uuid.uuid4().hex}@example.com"
+        setup.post(f"{base_url}/register", json={"email": user_email, "password": PASSWORD})
+        token = setup.post(f"{base_url}/login", json={"email": user_email, "password": PASSWORD}).json()['access_token']
+
+        admin_cookies = None
+        if admin_email and admin_password:
+            admin = requests.Session()
+            admin.post(f"{base_url}/admin/login", data={"email": admin_email, "password": admin_password},
+                       allow_redirects=False)
+            admin_cookies = admin.cookies
+
+        scenarios = build_scenarios(base_url, user_email, token, admin_cookies)
+        if args.endpoints:
+            wanted = [e.strip() for e in args.endpoints.split(',')]
+            scenarios = [s for s in scenarios if any(s[0].endswith(w) for w in wanted)]
+
+        results = []
+        for name, prepare, send in scenarios:
+            for level in levels:
+                results.append(run_load(name, level, args.requests, prepare, send, args.warmup))
+
+        config = {
+            "base_url": base_url,
+            "fast_path": fast_path_stats(base_url),
+            "server": None if args.base_url else args.server,
+            "concurrency": levels,
+            "requests_per_level": args.requests,
+            "rasa_latency_ms": None if args.base_url else args.rasa_latency_ms,
+            "rasa_messages": None if args.base_url else args.rasa_messages,
+        }
+        write_report("app", config, results, args.output)
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            process.wait(timeout=10)
+        tmpdir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+import json
+import math
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = math.ceil(fraction * len(sorted_values))
+    return sorted_values[min(len(sorted_values), max(rank, 1)) - 1]
+
+
+def summarize(name, latencies, elapsed, errors, **extra):
+    """Builds one result record; latencies are in seconds, output in milliseconds."""
+    ordered = sorted(latencies)
+    to_ms = lambda value: None if value is None else round(value * 1000, 3)
+    result = {
+        "name": name,
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "mean_ms": to_ms(sum(ordered) / len(ordered)) if ordered else None,
+        "p50_ms": to_ms(percentile(ordered, 0.50)),
+        "p95_ms": to_ms(percentile(ordered, 0.95)),
+        "p99_ms": to_ms(percentile(ordered, 0.99)),
+        "max_ms": to_ms(ordered[-1]) if ordered else None,
+    }
+    result.update(extra)
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def write_report(suite, config, results, output=None):
+    """Writes results as JSON (to a file or stdout) and a readable table to stderr."""
+    report = {
+        "suite": suite,
+        "started_at": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, 'w') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    header = f"{'benchmark':<42}{'conc':>6}{'reqs':>8}{'err':>6}{'shed':>6}{'rps':>10}{'p50':>9}{'p95':>9}{'p99':>9}"
+    print(header, file=sys.stderr)
+    for r in results:
+        print(f"{r['name']:<42}{r.get('concurrency', 1):>6}{r['requests']:>8}{r['errors']:>6}{r.get('shed', 0):>6}"
+              f"{r['rps'] or 0:>10.1f}{r['p50_ms'] or 0:>9.3f}{r['p95_ms'] or 0:>9.3f}{r['p99_ms'] or 0:>9.3f}",
+              file=sys.stderr)
+    return report
+
+
+def wait_for_port(host, port, timeout=15.0):
+    import socket
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Nothing listening on {host}:{port} after {timeout}s")
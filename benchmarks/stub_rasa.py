@@ -0,0 +1,96 @@
+"""Stand-in for the Rasa REST webhook, used by the offline benchmarks.
+
+Answers POST /webhooks/rest/webhook with a fixed list of bot messages, each
+taking an artificial delay (as if produced by its own action), so the Flask
+app can be measured without Rasa, the action server or a trained model.
+With ?stream=true each message is written as its own JSON line as soon as
+its delay is over, like Rasa's REST channel; otherwise the list is sent
+once every message is ready. GET / answers like Rasa's root endpoint
+(the client's health probe). Tracker event appends
+(POST /conversations/<id>/tracker/events) are accepted without delay.
+
+    python benchmarks/stub_rasa.py --port 5905 --latency-ms 50
+"""
+import argparse
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_handler(latency_ms=0.0, jitter_ms=0.0, messages=1):
+    class StubRasaHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'      # keep-alive, like Rasa's Sanic server
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            # Rasa's root endpoint, which the Flask client uses as a health probe.
+            self._reply(b'"Hello from the stub Rasa server"')
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            if self.path.startswith('/conversations/'):
+                # Tracker event appends from the Flask fast path: accept and ignore.
+                self._reply(b'{}')
+                return
+            replies = [
+                {"recipient_id": payload.get("sender"), "text": f"stub reply {i + 1} to: {payload.get('message')}"}
+                for i in range(messages)
+            ]
+            if 'stream=true' in self.path:
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                for reply in replies:
+                    self._wait()
+                    line = (json.dumps(reply) + "\n").encode()
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+                return
+            for _ in replies:
+                self._wait()
+            self._reply(json.dumps(replies).encode())
+
+        def _wait(self):
+            delay = latency_ms + (random.uniform(-jitter_ms, jitter_ms) if jitter_ms else 0.0)
+            if delay > 0:
+                time.sleep(delay / 1000.0)
+
+        def _reply(self, body):
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubRasaHandler
+
+
+def serve(port, latency_ms=0.0, jitter_ms=0.0, messages=1, host='127.0.0.1'):
+    server = ThreadingHTTPServer((host, port), make_handler(latency_ms, jitter_ms, messages))
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5905)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Delay before each bot message")
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help="Random +/- spread on the delay")
+    parser.add_argument('--messages', type=int, default=1, help="Bot messages per reply")
+    args = parser.parse_args()
+
+    server = serve(args.port, args.latency_ms, args.jitter_ms, args.messages, args.host)
+    print(f"Stub Rasa webhook on http://{args.host}:{args.port}/webhooks/rest/webhook "
+          f"(latency {args.latency_ms} ms)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
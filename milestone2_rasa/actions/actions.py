@@ -1,15 +1,69 @@
 from typing import Any, Text, Dict, List
 from rasa_sdk import Action, Tracker
 from rasa_sdk.executor import CollectingDispatcher
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine
 import os
+import time
+
+from .knowledge_index import KnowledgeIndex
+from .metrics import Registry
+from .metrics_server import start_http_server
+from .wellness_summary import (
+    read_latest_for_account as read_latest_rolling_for_account, summary_line as rolling_summary_line
+)
+from .structured_logging import get_logger, log_event
+import logging
+
+logger = get_logger('wellbot.actions')
+
+# Slot (see domain.yml) holding the last ask_* intent of the conversation.
+LAST_INTENT_SLOT = 'last_knowledge_intent'
+
+# --- Metrics (Prometheus text on http://<host>:ACTION_METRICS_PORT/metrics; 0 disables) ---
+METRICS_PORT = int(os.environ.get('ACTION_METRICS_PORT', '5056'))
+LOOKUP_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+
+metrics = Registry()
+ACTION_SECONDS = metrics.histogram(
+    'wellbot_action_run_seconds', 'Time spent in an action run() call.', ['action'], buckets=LOOKUP_BUCKETS)
+LOOKUP_SECONDS = metrics.histogram(
+    'wellbot_knowledge_lookup_seconds',
+    'Knowledge lookup time, by the database work the index refresh needed (none, version_check, reload, error).',
+    ['db'], buckets=LOOKUP_BUCKETS)
+FALLBACK_DEPTH = metrics.histogram(
+    'wellbot_knowledge_fallback_depth',
+    'Fallback depth reached per lookup: 0 exact, 1 ask_wellness_tip, 2 default entry, 3 no answer.',
+    ['intent', 'lang'], buckets=(0, 1, 2, 3))
+ENTITY_MATCHES = metrics.counter(
+    'wellbot_entity_matches_total', 'How the condition entity was matched (exact, normalized, synonym, fuzzy, none).',
+    ['match'])
+LOOKUP_ERRORS = metrics.counter('wellbot_knowledge_lookup_errors_total', 'Lookups that failed with a database error.')
+_metrics_server = None
+
+
+def start_metrics_server():
+    """Starts the /metrics listener once per process."""
+    global _metrics_server
+    if _metrics_server is not None or not METRICS_PORT:
+        return
+    try:
+        _metrics_server = start_http_server(metrics, METRICS_PORT)
+        logger.info("Action server metrics on port %d", METRICS_PORT)
+    except OSError:
+        logger.exception("Could not serve metrics on port %d", METRICS_PORT)
+        _metrics_server = False
 
 class ActionQueryKnowledgeBase(Action):
 
     def __init__(self):
-        db_path = os.path.join(os.path.dirname(__file__), '..', '..', 'InfyWellBot', 'project.db')
+        db_path = os.environ.get(
+            'WELLBOT_DB_PATH',
+            os.path.join(os.path.dirname(__file__), '..', '..', 'InfyWellBot', 'project.db')
+        )
         self.db_engine = create_engine(f'sqlite:///{os.path.abspath(db_path)}')
-        print(f"Action server connected to DB at: {os.path.abspath(db_path)}")
+        logger.info("Action server connected to DB at: %s", os.path.abspath(db_path))
+        self.knowledge = KnowledgeIndex(self.db_engine)
+        start_metrics_server()
 
     def name(self) -> Text:
         return "action_query_knowledge_base"
@@ -17,100 +71,110 @@ class ActionQueryKnowledgeBase(Action):
     def run(self, dispatcher: CollectingDispatcher,
             tracker: Tracker,
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+        # Everything worth knowing about the turn ends up in this one log record.
+        turn: Dict[Text, Any] = {"sender": tracker.sender_id}
+        started = time.perf_counter()
+        try:
+            return self._run(dispatcher, tracker, turn)
+        except Exception:
+            turn["outcome"] = "error"
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            ACTION_SECONDS.observe(elapsed, self.name())
+            turn["latency_ms"] = round(elapsed * 1000, 3)
+            log_event(logger, logging.INFO, "knowledge_turn", **turn)
 
-        print("\n--- ACTION SERVER RECEIVED ---")
+    def _run(self, dispatcher: CollectingDispatcher, tracker: Tracker,
+             turn: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         latest_intent = tracker.latest_message['intent'].get('name')
         entities = tracker.latest_message.get('entities', [])
         metadata = tracker.latest_message.get('metadata') # Get metadata from Flask
-        print(f"Detected Intent: {latest_intent}")
-        print(f"Detected Entities: {entities}")
-        print(f"Received Metadata: {metadata}")
+        log_event(logger, logging.DEBUG, "knowledge_turn_input", sender=tracker.sender_id,
+                  intent=latest_intent, entities=entities, metadata=metadata)
 
         entity_value = next((e['value'] for e in entities if e['entity'] == 'condition'), None)
-        print(f"Extracted Condition Entity: {entity_value}")
 
         # --- GET LANGUAGE FROM METADATA ---
         user_language = metadata.get('user_language', 'en') if metadata else 'en'
         # Basic validation, default to 'en'
         if user_language not in ['en', 'hi']:
             user_language = 'en'
-        response_column = f"response_{user_language}" # 'response_en' or 'response_hi'
-        print(f"Using language column: {response_column}")
         # --- END GET LANGUAGE ---
+        turn.update(intent=latest_intent, entity=entity_value, lang=user_language)
 
         valid_intent = None
         # --- FIX: ADD 'ask_prevention' TO THIS LIST ---
         if latest_intent in ['ask_symptom', 'ask_first_aid', 'ask_wellness_tip', 'ask_prevention']:
             valid_intent = latest_intent
         elif entity_value and latest_intent == 'inform':
-            # ... (history lookup logic remains the same) ...
-            for event in reversed(tracker.events):
-                    if event.get('event') == 'user':
-                        prev_intent = event.get('parse_data', {}).get('intent', {}).get('name')
-                        # --- FIX: ADD 'ask_prevention' TO THIS LIST ---
-                        if prev_intent in ['ask_symptom', 'ask_first_aid', 'ask_wellness_tip', 'ask_prevention']:
-                            valid_intent = prev_intent
-                            print(f"Found previous relevant intent: {valid_intent}")
-                            break
-            if not valid_intent:
-                    valid_intent = 'ask_wellness_tip'
-                    print(f"Defaulting 'inform' intent to: {valid_intent}")
-
-        print(f"Final Valid Intent for DB Query: {valid_intent}")
+            # The domain fills this slot from every ask_* turn, so a follow-up
+            # 'inform' needs no walk through tracker.events.
+            valid_intent = tracker.get_slot(LAST_INTENT_SLOT)
+            if valid_intent in ['ask_symptom', 'ask_first_aid', 'ask_wellness_tip', 'ask_prevention']:
+                turn["intent_source"] = "slot"
+            else:
+                valid_intent = 'ask_wellness_tip'
+                turn["intent_source"] = "default"
+
+        turn["resolved_intent"] = valid_intent
 
         if not entity_value:
              # ... (missing entity logic remains the same) ...
              # --- FIX: ADD 'ask_prevention' TO THIS LIST ---
              if latest_intent in ['ask_symptom', 'ask_first_aid', 'ask_wellness_tip', 'inform', 'ask_prevention']:
+                    turn["outcome"] = "ask_condition"
                     dispatcher.utter_message(response="utter_ask_condition")
                     return []
              else:
+                    turn["outcome"] = "not_found"
                     dispatcher.utter_message(response="utter_not_found")
                     return []
 
         response_text = None
         if valid_intent:
             try:
-                with self.db_engine.connect() as conn:
-                    # --- USE CORRECT LANGUAGE COLUMN ---
-                    query = text(f"SELECT {response_column} FROM health_knowledge WHERE intent = :i AND entity = :e")
-                    # --- END USE CORRECT LANGUAGE ---
-                    result = conn.execute(query, {"i": valid_intent, "e": entity_value.lower()}).fetchone()
-
-                    if result and result[0]:
-                        response_text = result[0]
-                        print(f"Found DB entry for intent='{valid_intent}', entity='{entity_value}', lang='{user_language}'")
-                    else:
-                        # ... (fallback logic remains the same, but uses response_column) ...
-                        print(f"DB entry not found for intent='{valid_intent}', lang='{user_language}'. Falling back...")
-                        fallback_intent = 'ask_wellness_tip'
-                        if valid_intent != fallback_intent:
-                                query_fallback = text(f"SELECT {response_column} FROM health_knowledge WHERE intent = :i AND entity = :e LIMIT 1")
-                                result_fallback = conn.execute(query_fallback, {"i": fallback_intent, "e": entity_value.lower()}).fetchone()
-                                if result_fallback and result_fallback[0]:
-                                    response_text = result_fallback[0]
-                                    print(f"Found fallback DB entry for intent='{fallback_intent}', entity='{entity_value}', lang='{user_language}'")
-                        
-                        # If still no response_text, use the default for the intent
-                        if not response_text:
-                            print(f"No specific entry for {entity_value}, trying default for intent {valid_intent}")
-                            query_default = text(f"SELECT {response_column} FROM health_knowledge WHERE intent = :i AND entity = 'default' LIMIT 1")
-                            result_default = conn.execute(query_default, {"i": valid_intent}).fetchone()
-                            if result_default and result_default[0]:
-                                response_text = result_default[0]
-
-            except Exception as e:
-                print(f"!!! Database error: {e}")
+                lookup_started = time.perf_counter()
+                db_work = self.knowledge.refresh()
+                entity_key, entity_match = self.knowledge.match_entity(entity_value)
+                response_text, depth = self.knowledge.lookup(valid_intent, entity_key, user_language)
+                lookup_seconds = time.perf_counter() - lookup_started
+                LOOKUP_SECONDS.observe(lookup_seconds, db_work)
+                FALLBACK_DEPTH.observe(3 if depth is None else depth, valid_intent, user_language)
+                ENTITY_MATCHES.inc(entity_match or 'none')
+                turn.update(matched_entity=entity_key, entity_match=entity_match, fallback_depth=depth,
+                            db_work=db_work, lookup_ms=round(lookup_seconds * 1000, 3))
+            except Exception:
+                LOOKUP_ERRORS.inc()
+                log_event(logger, logging.ERROR, "knowledge_lookup_failed", exc_info=True,
+                          intent=valid_intent, lang=user_language)
+                turn["outcome"] = "db_error"
                 response_text = "Sorry, I encountered a database problem."
 
         if response_text:
-            print(f"Sending reply (lang={user_language}): {response_text}")
+            turn.setdefault("outcome", "answered")
+            if valid_intent == 'ask_wellness_tip' and turn["outcome"] == "answered":
+                response_text = self._with_rolling_summary(tracker.sender_id, response_text, user_language, turn)
             dispatcher.utter_message(text=response_text)
         elif valid_intent:
-             print(f"No DB entry found for entity='{entity_value}' for intent='{valid_intent}' or fallback (lang={user_language}).")
+             turn["outcome"] = "not_found"
              dispatcher.utter_message(response="utter_not_found")
         else:
-             print("Have entity but no valid intent determined.")
+             turn["outcome"] = "no_intent"
              dispatcher.utter_message(text=f"I have information about '{entity_value}', but I'm not sure what you want to know. You can ask about symptoms, first aid, or wellness tips.")
 
-        return []
\ No newline at end of file
+        return []
+
+    def _with_rolling_summary(self, sender_id: Text, response_text: Text, lang: Text,
+                              turn: Dict[Text, Any]) -> Text:
+        """Appends the 7-day wellness averages linked to the sender's account, if any."""
+        try:
+            with self.db_engine.connect() as conn:
+                summary = rolling_summary_line(read_latest_rolling_for_account(conn, sender_id), lang)
+        except Exception:
+            # Databases loaded before the rolling table existed have nothing to add.
+            log_event(logger, logging.DEBUG, "rolling_summary_failed", exc_info=True, sender=sender_id)
+            turn["rolling"] = "error"
+            return response_text
+        turn["rolling"] = "added" if summary else "none"
+        return f"{response_text}\n\n{summary}" if summary else response_text
@@ -0,0 +1,274 @@
+import logging
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Set, Text, Tuple
+
+try:
+    import yaml
+except ImportError:  # only needed to read synonyms from the Rasa NLU files
+    yaml = None
+
+logger = logging.getLogger('wellbot.actions.entities')
+
+# Minimum Dice similarity of character trigrams for a fuzzy match ("migrane"
+# vs "migraine" scores about 0.67, "flu" vs "flue" 0.67).
+MATCH_THRESHOLD = float(os.environ.get('ENTITY_MATCH_THRESHOLD', '0.6'))
+# Rasa NLU files whose `synonym:` blocks are read (Hindi names -> English entity).
+NLU_DATA_DIR = os.environ.get(
+    'NLU_DATA_DIR', os.path.join(os.path.dirname(__file__), '..', 'data')
+)
+CACHE_SIZE = 4096
+# Words shorter than this must match exactly ("uti" is not a typo of "cut").
+MIN_FUZZY_WORD = 4
+
+# Common English variants that are not close enough in spelling to match fuzzily.
+SYNONYMS = {
+    'covid': 'covid-19',
+    'corona': 'covid-19',
+    'coronavirus': 'covid-19',
+    'high blood pressure': 'hypertension',
+    'blood pressure': 'hypertension',
+    'urinary tract infection': 'uti',
+    'heat stroke': 'heatstroke',
+    'sunstroke': 'heatstroke',
+    'burn': 'minor burn',
+    'burns': 'minor burn',
+    'allergy': 'seasonal allergies',
+    'allergies': 'seasonal allergies',
+    'hay fever': 'seasonal allergies',
+    'stomachache': 'stomach ache',
+    'stomach pain': 'stomach ache',
+    'tummy ache': 'stomach ache',
+    'conjunctivitis': 'pink eye',
+    'broken bone': 'fracture',
+    'strep': 'strep throat',
+    'common cold': 'cold',
+    'influenza': 'flu',
+    'sleeplessness': 'insomnia',
+    'nose bleed': 'nosebleed',
+    'bug bite': 'insect bite',
+}
+
+# The per-intent fallback row is reached through the fallback chain, never by matching.
+EXCLUDED_ENTITIES = {'default'}
+
+_PUNCTUATION = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def normalize(value: Text) -> Text:
+    """Case-folded, NFKC-normalized text with punctuation runs turned into single spaces."""
+    value = unicodedata.normalize('NFKC', value).casefold()
+    return _PUNCTUATION.sub(' ', value).strip()
+
+
+def trigrams(value: Text) -> Set[Text]:
+    padded = f"  {value} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def load_nlu_synonyms(data_dir: Text = NLU_DATA_DIR) -> Dict[Text, Text]:
+    """Reads `- synonym:` blocks from every *.yml under data_dir."""
+    synonyms: Dict[Text, Text] = {}
+    if yaml is None or not os.path.isdir(data_dir):
+        return synonyms
+    for root, _, files in os.walk(data_dir):
+        for filename in sorted(files):
+            if not filename.endswith(('.yml', '.yaml')):
+                continue
+            try:
+                with open(os.path.join(root, filename), encoding='utf-8') as f:
+                    document = yaml.safe_load(f) or {}
+            except (OSError, yaml.YAMLError):
+                logger.warning("Could not read synonyms from %s", filename)
+                continue
+            for block in document.get('nlu') or []:
+                if not isinstance(block, dict) or 'synonym' not in block:
+                    continue
+                for line in str(block.get('examples', '')).splitlines():
+                    alias = line.strip().lstrip('-').strip()
+                    if alias:
+                        synonyms[alias] = block['synonym']
+    return synonyms
+
+
+class EntityMatcher:
+    """Maps what the user typed to an entity that exists in health_knowledge.
+
+    Tried in order: exact, normalized form (case, punctuation, spacing, so
+    "Covid 19" finds "covid-19"), synonym table, then a fuzzy match. Fuzzy
+    matching corrects each query word against the vocabulary of entity words
+    (character-trigram index) and only accepts an entity made of exactly the
+    corrected words, so a typo is forgiven but a different or partial
+    condition is not ("stomach flu" is not "stomach ache", "throat" is not
+    "strep throat"). Among those it picks the one with the best trigram Dice
+    similarity of at least MATCH_THRESHOLD. Only short posting
+    lists are touched and results are memoised, so lookups stay well under a
+    millisecond with tens of thousands of entities. update() applies just
+    the added and removed entities.
+    """
+
+    def __init__(self, synonyms: Optional[Dict[Text, Text]] = None, threshold: float = MATCH_THRESHOLD):
+        self.threshold = threshold
+        self._synonyms = {normalize(alias): target for alias, target in (synonyms or {}).items()}
+        self._entities: Set[Text] = set()
+        # Normalized and space-free forms -> the entities that have them.
+        self._owners: Dict[Text, Set[Text]] = {}
+        # Word -> normalized entities containing it, and trigram -> words.
+        self._word_entities: Dict[Text, Set[Text]] = {}
+        self._word_postings: Dict[Text, Set[Text]] = {}
+        self._cache: "OrderedDict[Text, Tuple[Optional[Text], Optional[Text]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def with_default_synonyms(cls, **kwargs) -> "EntityMatcher":
+        synonyms = dict(SYNONYMS)
+        synonyms.update(load_nlu_synonyms())
+        return cls(synonyms, **kwargs)
+
+    def __len__(self):
+        return len(self._entities)
+
+    def _add(self, entity: Text):
+        normal = normalize(entity)
+        if entity in EXCLUDED_ENTITIES or not normal:
+            return
+        for key in {normal, normal.replace(' ', '')}:
+            self._owners.setdefault(key, set()).add(entity)
+        for word in set(normal.split()):
+            entities = self._word_entities.get(word)
+            if entities is None:
+                entities = self._word_entities[word] = set()
+                for gram in trigrams(word):
+                    self._word_postings.setdefault(gram, set()).add(word)
+            entities.add(normal)
+
+    def _remove(self, entity: Text):
+        normal = normalize(entity)
+        for key in {normal, normal.replace(' ', '')}:
+            owners = self._owners.get(key)
+            if owners is not None:
+                owners.discard(entity)
+                if not owners:
+                    del self._owners[key]
+        if normal in self._owners:
+            # Another entity still has this normalized form.
+            return
+        for word in set(normal.split()):
+            entities = self._word_entities.get(word)
+            if entities is None:
+                continue
+            entities.discard(normal)
+            if not entities:
+                del self._word_entities[word]
+                for gram in trigrams(word):
+                    posting = self._word_postings.get(gram)
+                    if posting is not None:
+                        posting.discard(word)
+                        if not posting:
+                            del self._word_postings[gram]
+
+    def _owner(self, key: Text) -> Optional[Text]:
+        owners = self._owners.get(key)
+        return min(owners) if owners else None
+
+    def update(self, entities: Iterable[Text]) -> Tuple[int, int]:
+        """Brings the index in line with `entities`; returns (added, removed)."""
+        current = set(entities)
+        with self._lock:
+            removed = self._entities - current
+            added = current - self._entities
+            for entity in removed:
+                self._remove(entity)
+            for entity in added:
+                self._add(entity)
+            self._entities = current
+            if added or removed:
+                self._cache.clear()
+            return len(added), len(removed)
+
+    def _nearest_word(self, word: Text) -> Optional[Text]:
+        if word in self._word_entities:
+            return word
+        if len(word) < MIN_FUZZY_WORD:
+            return None
+        # Two swapped letters ("pian") share no trigrams with the word they meant.
+        for i in range(len(word) - 1):
+            swapped = word[:i] + word[i + 1] + word[i] + word[i + 2:]
+            if swapped in self._word_entities:
+                return swapped
+        grams = sorted(trigrams(word), key=lambda gram: len(self._word_postings.get(gram, ())))
+        size = len(grams)
+        threshold = self.threshold
+        # A word scoring >= threshold shares at least `required` trigrams, so it
+        # must appear in one of the size - required + 1 rarest posting lists.
+        required = max(1, math.ceil(threshold * size / (2.0 - threshold)))
+        seen: Set[Text] = set()
+        best, best_score = None, 0.0
+        for gram in grams[:size - required + 1]:
+            for candidate in self._word_postings.get(gram, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                candidate_grams = len(candidate) + 2
+                overlap = sum(1 for g in grams if candidate in self._word_postings.get(g, ()))
+                score = 2.0 * overlap / (size + candidate_grams)
+                if score >= threshold and (score > best_score or (score == best_score and candidate < best)):
+                    best, best_score = candidate, score
+        return best
+
+    def _nearest(self, normal: Text) -> Optional[Text]:
+        words = set()
+        for word in normal.split():
+            known = self._nearest_word(word)
+            if known is None:
+                # A word that is no entity's word means another condition.
+                return None
+            words.add(known)
+        postings = sorted((self._word_entities[word] for word in words), key=len)
+        candidates = set(postings[0]).intersection(*postings[1:])
+        query = trigrams(normal)
+        best, best_score = None, 0.0
+        for candidate in candidates:
+            if set(candidate.split()) != words:
+                continue
+            grams = trigrams(candidate)
+            score = 2.0 * len(query & grams) / (len(query) + len(grams))
+            if score >= self.threshold and (score > best_score or (score == best_score and candidate < best)):
+                best, best_score = candidate, score
+        return best
+
+    def _match(self, value: Text) -> Tuple[Optional[Text], Optional[Text]]:
+        if value in self._entities:
+            return value, 'exact'
+        normal = normalize(value)
+        if not normal:
+            return None, None
+        owner = self._owner(normal) or self._owner(normal.replace(' ', ''))
+        if owner is not None:
+            return owner, 'normalized'
+        target = self._synonyms.get(normal)
+        if target is not None:
+            owner = self._owner(normalize(target))
+            if owner is not None:
+                return owner, 'synonym'
+        nearest = self._nearest(normal)
+        if nearest is not None:
+            return self._owner(nearest), 'fuzzy'
+        return None, None
+
+    def match(self, value: Text) -> Tuple[Optional[Text], Optional[Text]]:
+        """Returns (entity, how) with how in exact/normalized/synonym/fuzzy, or (None, None)."""
+        with self._lock:
+            hit = self._cache.get(value)
+            if hit is not None:
+                self._cache.move_to_end(value)
+                return hit
+            result = self._match(value)
+            self._cache[value] = result
+            if len(self._cache) > CACHE_SIZE:
+                self._cache.popitem(last=False)
+            return result
@@ -0,0 +1,144 @@
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional, Text, Tuple
+
+from sqlalchemy import text
+
+from .entity_matcher import EntityMatcher
+
+logger = logging.getLogger('wellbot.actions.knowledge')
+
+# Intents that have rows in health_knowledge and can be answered by the action.
+KNOWLEDGE_INTENTS = ['ask_symptom', 'ask_first_aid', 'ask_wellness_tip', 'ask_prevention']
+FALLBACK_INTENT = 'ask_wellness_tip'
+DEFAULT_ENTITY = 'default'
+LANGUAGES = ['en', 'hi']
+
+# How often (seconds) the action server asks project.db whether the admin
+# dashboard has changed the knowledge base. Lookups in between never touch the DB.
+VERSION_CHECK_INTERVAL = float(os.environ.get('KB_VERSION_CHECK_INTERVAL', '2.0'))
+
+# Fallback depth reached for a lookup: 0 = exact match, 1 = ask_wellness_tip
+# entry for the same entity, 2 = 'default' entry for the intent.
+EXACT, WELLNESS_FALLBACK, DEFAULT_FALLBACK = 0, 1, 2
+
+
+class KnowledgeIndex:
+    """In-memory copy of the health_knowledge table.
+
+    The table is read once and every (intent, entity, language) key is mapped
+    to its final answer, with the exact -> ask_wellness_tip -> 'default'
+    fallback chain already applied. The Flask admin routes bump the counter in
+    the kb_version table whenever they change a tip; the index reloads when it
+    sees a newer counter.
+    """
+
+    def __init__(self, db_engine):
+        self.db_engine = db_engine
+        self.version = None
+        self._resolved: Dict[Tuple[Text, Text, Text], Tuple[Text, int]] = {}
+        self._defaults: Dict[Tuple[Text, Text], Text] = {}
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self.entities = EntityMatcher.with_default_synonyms()
+
+    def _read_version(self, conn) -> int:
+        try:
+            row = conn.execute(text("SELECT version FROM kb_version WHERE id = 1")).fetchone()
+        except Exception:
+            # Older databases have no kb_version table yet.
+            return 0
+        return row[0] if row else 0
+
+    def _build(self, rows):
+        exact: Dict[Tuple[Text, Text, Text], Text] = {}
+        for intent, entity, response_en, response_hi in rows:
+            for lang, response in (('en', response_en), ('hi', response_hi)):
+                if response:
+                    exact.setdefault((intent, entity, lang), response)
+
+        defaults = {
+            (intent, lang): response
+            for (intent, entity, lang), response in exact.items()
+            if entity == DEFAULT_ENTITY
+        }
+
+        entities = {entity for (_, entity, _) in exact}
+        resolved: Dict[Tuple[Text, Text, Text], Tuple[Text, int]] = {}
+        for intent in KNOWLEDGE_INTENTS:
+            for entity in entities:
+                for lang in LANGUAGES:
+                    key = (intent, entity, lang)
+                    if key in exact:
+                        resolved[key] = (exact[key], EXACT)
+                    elif (FALLBACK_INTENT, entity, lang) in exact:
+                        resolved[key] = (exact[(FALLBACK_INTENT, entity, lang)], WELLNESS_FALLBACK)
+                    elif (intent, lang) in defaults:
+                        resolved[key] = (defaults[(intent, lang)], DEFAULT_FALLBACK)
+        return resolved, defaults
+
+    def reload(self):
+        """Reads the whole table and swaps in a freshly resolved index."""
+        with self.db_engine.connect() as conn:
+            version = self._read_version(conn)
+            rows = conn.execute(text(
+                "SELECT intent, entity, response_en, response_hi FROM health_knowledge ORDER BY id"
+            )).fetchall()
+        resolved, defaults = self._build(rows)
+        added, removed = self.entities.update(row[1] for row in rows)
+        self._resolved, self._defaults, self.version = resolved, defaults, version
+        logger.info("Knowledge index loaded: %d rows, version %s (%d entities added, %d removed)",
+                    len(rows), version, added, removed)
+
+    def refresh(self, force: bool = False) -> Text:
+        """Reloads the index if it is empty or kb_version has moved on.
+
+        The version row is read at most once per VERSION_CHECK_INTERVAL.
+        Returns which database work was done: 'none', 'version_check', 'reload'
+        or 'error' (a failed check or reload; the previous index is kept).
+        """
+        now = time.monotonic()
+        if not force and self.version is not None and now - self._last_check < VERSION_CHECK_INTERVAL:
+            return 'none'
+        with self._lock:
+            if not force and self.version is not None and now - self._last_check < VERSION_CHECK_INTERVAL:
+                return 'none'
+            if self.version is None:
+                # Nothing to serve yet, so let a failed first load reach the caller.
+                self.reload()
+                self._last_check = now
+                return 'reload'
+            try:
+                if force:
+                    self.reload()
+                    return 'reload'
+                with self.db_engine.connect() as conn:
+                    current = self._read_version(conn)
+                if current != self.version:
+                    self.reload()
+                    return 'reload'
+                return 'version_check'
+            except Exception:
+                logger.exception("Knowledge index refresh failed, serving version %s", self.version)
+                return 'error'
+            finally:
+                self._last_check = now
+
+    def match_entity(self, value: Text) -> Tuple[Text, Optional[Text]]:
+        """Maps user text to a known entity: (entity, how), or (value.lower(), None) without a match."""
+        entity, how = self.entities.match(value)
+        if entity is None:
+            return value.lower(), None
+        return entity, how
+
+    def lookup(self, intent: Text, entity: Text, lang: Text) -> Tuple[Optional[Text], Optional[int]]:
+        """Returns (response, fallback depth), or (None, None) if nothing matches."""
+        hit = self._resolved.get((intent, entity, lang))
+        if hit is not None:
+            return hit
+        default = self._defaults.get((intent, lang))
+        if default is not None:
+            return default, DEFAULT_FALLBACK
+        return None, None
@@ -0,0 +1,33 @@
+"""Serves the action server's metrics registry over HTTP.
+
+rasa_sdk owns the action server's HTTP app, so /metrics is served from a
+port of its own (ACTION_METRICS_PORT) by a small stdlib server.
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .metrics import CONTENT_TYPE
+
+
+def start_http_server(registry, port, host='0.0.0.0'):
+    """Serves registry.render() on GET /metrics from a daemon thread."""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
@@ -0,0 +1,122 @@
+"""Structured, non-blocking logging.
+
+InfyWellBot/structured_logging.py and milestone2_rasa/actions/structured_logging.py
+are the same file; edit both (InfyWellBot/tests/test_shared_modules.py checks).
+
+get_logger() returns a logger whose only handler is a QueueHandler: the
+calling thread just puts the record on an in-memory queue, and a
+QueueListener thread formats it (one JSON object per line) and writes it to
+stdout. Records below LOG_LEVEL are dropped before any of that happens.
+
+Use log_event() for anything on a hot path; it checks the level before the
+fields are touched and keeps them as separate JSON keys:
+
+    log_event(logger, logging.INFO, "chat_turn", intent=intent, latency_ms=12.3)
+
+LOG_LEVEL (default INFO) and LOG_FORMAT ('json' or 'text') come from the
+environment.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from datetime import datetime, timezone
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json').lower()
+
+_listeners = {}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s %(message)s')
+
+    def format(self, record):
+        line = super().format(record)
+        fields = getattr(record, 'fields', None)
+        if fields:
+            line += ' ' + ' '.join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # The stock prepare() copies the record and folds the traceback into
+        # the message. This handler is the record's only consumer, so edit it
+        # in place and keep the traceback separate for the formatter.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def get_logger(name):
+    """Returns the named logger, wiring up its queue and listener thread on first use."""
+    logger = logging.getLogger(name)
+    if name in _listeners:
+        return logger
+
+    records = queue.SimpleQueue()
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(TextFormatter() if LOG_FORMAT == 'text' else JsonFormatter())
+    listener = logging.handlers.QueueListener(records, output, respect_handler_level=False)
+    listener.start()
+    atexit.register(listener.stop)
+    _listeners[name] = listener
+
+    logger.addHandler(_QueueHandler(records))
+    logger.setLevel(LOG_LEVEL)
+    # Keep records away from whatever the host framework put on the root logger.
+    logger.propagate = False
+    return logger
+
+
+def log_event(logger, level, event, exc_info=None, **fields):
+    """Logs one structured record if `level` is enabled; fields become top-level JSON keys."""
+    if logger.isEnabledFor(level):
+        if exc_info is True:
+            exc_info = sys.exc_info()
+        # makeRecord + handle skips findCaller's stack walk; callers are identified by `event`.
+        record = logger.makeRecord(logger.name, level, '(event)', 0, event, None, exc_info,
+                                   extra={"fields": fields})
+        logger.handle(record)
+
+
+def _stop_listeners():
+    for listener in _listeners.values():
+        if listener._thread is not None:
+            listener.stop()
+
+
+def _start_listeners():
+    for listener in _listeners.values():
+        if listener._thread is None:
+            listener.start()
+
+
+# Listener threads do not survive fork(). Drain them before a pre-forking
+# server forks and start them again on both sides, so every worker keeps
+# logging and no queued record is written twice.
+os.register_at_fork(before=_stop_listeners, after_in_parent=_start_listeners, after_in_child=_start_listeners)
@@ -0,0 +1,73 @@
+"""Read side of the per-user rolling wellness averages.
+
+user_wellness_rolling is written by InfyWellBot/load_db.py (see
+InfyWellBot/wellness_rollup.py). The app and the action server read it here
+to follow wellness tips with the user's 7-day averages.
+
+InfyWellBot/wellness_summary.py and milestone2_rasa/actions/wellness_summary.py
+are the same file; edit both (InfyWellBot/tests/test_shared_modules.py checks).
+"""
+from sqlalchemy import text
+
+TABLE_NAME = 'user_wellness_rolling'
+# App accounts; user.wellness_user_id maps one to its wellness UserID.
+ACCOUNT_TABLE = 'user'
+WINDOWS = (7, 30)
+METRICS = ['Steps', 'SleepHours', 'CalorieBalance', 'WaterIntake_L']
+# Column order of user_wellness_rolling (must match UserWellnessRolling in app.py).
+COLUMNS = (['UserID', 'Date']
+           + [f"{metric}_{days}d" for days in WINDOWS for metric in METRICS]
+           + [f"Days_{days}d" for days in WINDOWS])
+
+
+def read_latest(conn, user_id, on=None):
+    """The user's newest rolling row dated on or before `on`, as a dict, or None.
+
+    `conn` is anything with a SQLAlchemy-style execute(): an engine
+    connection or a Flask-SQLAlchemy session.
+    """
+    sql = f"SELECT {', '.join(COLUMNS)} FROM {TABLE_NAME} WHERE UserID = :user"
+    params = {"user": user_id}
+    if on:
+        sql += " AND Date <= :on"
+        params["on"] = str(on)
+    row = conn.execute(text(sql + " ORDER BY Date DESC LIMIT 1"), params).fetchone()
+    return dict(zip(COLUMNS, row)) if row else None
+
+
+def read_latest_for_account(conn, account_id, on=None):
+    """read_latest() for the wellness UserID an admin linked to app account
+    `account_id` (user.wellness_user_id); None while nothing is linked.
+    """
+    row = conn.execute(text(f"SELECT wellness_user_id FROM {ACCOUNT_TABLE} WHERE id = :id"),
+                       {"id": account_id}).fetchone()
+    if row is None or row[0] is None:
+        return None
+    return read_latest(conn, row[0], on)
+
+def summary_line(row, language='en'):
+    """One sentence of 7-day averages (30-day steps for comparison) for a tip reply, or None."""
+    if not row or not row.get('Days_7d'):
+        return None
+    parts = []
+    steps, steps_30 = row.get('Steps_7d'), row.get('Steps_30d')
+    sleep, water, balance = row.get('SleepHours_7d'), row.get('WaterIntake_L_7d'), row.get('CalorieBalance_7d')
+    if language == 'hi':
+        if steps is not None:
+            parts.append(f"{steps:,.0f} कदम/दिन" + (f" (30 दिन: {steps_30:,.0f})" if steps_30 is not None else ""))
+        if sleep is not None:
+            parts.append(f"{sleep:.1f} घंटे नींद")
+        if water is not None:
+            parts.append(f"{water:.1f} लीटर पानी")
+        if balance is not None:
+            parts.append(f"कैलोरी संतुलन {balance:+,.0f} kcal/दिन")
+        return f"{row['Date']} तक आपके 7 दिन के औसत: " + ", ".join(parts) + "।" if parts else None
+    if steps is not None:
+        parts.append(f"{steps:,.0f} steps/day" + (f" (30-day: {steps_30:,.0f})" if steps_30 is not None else ""))
+    if sleep is not None:
+        parts.append(f"{sleep:.1f} h sleep")
+    if water is not None:
+        parts.append(f"{water:.1f} L water")
+    if balance is not None:
+        parts.append(f"calorie balance {balance:+,.0f} kcal/day")
+    return f"Your 7-day averages to {row['Date']}: " + ", ".join(parts) + "." if parts else None
@@ -0,0 +1,192 @@
+"""Rasa tracker store on a local SQLite file with a bounded in-memory cache.
+
+Configured in endpoints.yml:
+
+    tracker_store:
+      type: sqlite_tracker_store.SQLiteLRUTrackerStore
+      db: trackers.db          # relative to the Rasa project directory
+      cache_size: 1000         # trackers kept in memory (least recently used go first)
+      max_events: 200          # events kept per conversation
+      idle_timeout: 1800       # seconds before an unused tracker leaves memory
+      retention_days: 30       # conversations idle longer are deleted from disk (0 keeps them)
+
+Every save is written through to SQLite, so conversations survive a restart
+of the Rasa server. Memory holds at most `cache_size` serialised trackers of
+at most `max_events` events each. When a conversation grows past
+`max_events`, the oldest events are dropped and replaced by a session start
+that carries the current slot values (and active loop) over, the same shape
+a new session with carry_over_slots has, so the dialogue state is unchanged.
+
+Several Rasa servers may share one trackers.db (the replicas in
+docker-compose.yml). A cached tracker is only used while its updated_at
+still matches the file, which costs one primary-key lookup, so a
+conversation that moves to another replica and back is never served stale.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Text
+
+from rasa.core.brokers.broker import EventBroker
+from rasa.core.tracker_store import SerializedTrackerAsText, TrackerStore
+from rasa.shared.core.constants import ACTION_SESSION_START_NAME
+from rasa.shared.core.conversation import Dialogue
+from rasa.shared.core.domain import Domain
+from rasa.shared.core.events import ActionExecuted, ActiveLoop, SessionStarted, SlotSet
+from rasa.shared.core.trackers import DialogueStateTracker, get_trackers_for_conversation_sessions
+
+logger = logging.getLogger(__name__)
+
+# How often (seconds) conversations past retention_days are deleted from disk.
+SWEEP_INTERVAL = 300.0
+
+
+class SQLiteLRUTrackerStore(TrackerStore, SerializedTrackerAsText):
+    """Write-through SQLite tracker store with an LRU cache and per-conversation event cap."""
+
+    def __init__(
+        self,
+        domain: Domain,
+        host: Optional[Text] = None,
+        db: Text = 'trackers.db',
+        cache_size: int = 1000,
+        max_events: int = 200,
+        idle_timeout: float = 1800,
+        retention_days: float = 30,
+        event_broker: Optional[EventBroker] = None,
+        **kwargs: Dict[Text, Any],
+    ) -> None:
+        super().__init__(domain, event_broker, **kwargs)
+        self.db_path = os.path.abspath(db)
+        self.cache_size = int(cache_size)
+        self.max_events = int(max_events)
+        self.idle_timeout = float(idle_timeout)
+        self.retention_seconds = float(retention_days) * 86400
+        # sender_id -> (serialised tracker, last use, updated_at); least recently used first.
+        self._cache: "OrderedDict[Text, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS trackers ("
+            "sender_id TEXT PRIMARY KEY, tracker TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_trackers_updated_at ON trackers (updated_at)")
+        logger.info("SQLite tracker store at %s (cache %d trackers, %d events each)",
+                    self.db_path, self.cache_size, self.max_events)
+
+    def _bounded_events(self, tracker: DialogueStateTracker) -> list:
+        """The tracker's events, with the oldest folded into a carried-over session start."""
+        events = list(tracker.events)
+        if len(events) <= self.max_events:
+            return events
+        carried = [
+            SlotSet(slot.name, slot.value)
+            for slot in tracker.slots.values()
+            if slot.value != slot.initial_value
+        ]
+        if tracker.active_loop_name:
+            carried.append(ActiveLoop(tracker.active_loop_name))
+        keep = events[-max(1, self.max_events - len(carried) - 2):]
+        prefix = [ActionExecuted(ACTION_SESSION_START_NAME), SessionStarted()] + carried
+        for event in prefix:
+            event.timestamp = keep[0].timestamp
+        return prefix + keep
+
+    def _remember(self, sender_id: Text, serialised: Text, updated_at: float, now: float) -> None:
+        """Puts a tracker at the hot end of the cache, then drops idle and excess entries."""
+        cache = self._cache
+        cache[sender_id] = (serialised, now, updated_at)
+        cache.move_to_end(sender_id)
+        while cache:
+            oldest_id, (_, last_used, _) = next(iter(cache.items()))
+            if len(cache) <= self.cache_size and now - last_used < self.idle_timeout:
+                break
+            del cache[oldest_id]
+
+    def _sweep(self, now: float) -> None:
+        if not self.retention_seconds or now - self._last_sweep < SWEEP_INTERVAL:
+            return
+        self._last_sweep = now
+        deleted = self._conn.execute(
+            "DELETE FROM trackers WHERE updated_at < ?", (time.time() - self.retention_seconds,)
+        ).rowcount
+        if deleted:
+            logger.info("Deleted %d conversations idle for more than %.0f days",
+                        deleted, self.retention_seconds / 86400)
+
+    async def save(self, tracker: DialogueStateTracker) -> None:
+        """Writes the (bounded) tracker to SQLite and the cache."""
+        await self.stream_events(tracker)
+        serialised = json.dumps(Dialogue(tracker.sender_id, self._bounded_events(tracker)).as_dict())
+        now, updated_at = time.monotonic(), time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO trackers (sender_id, tracker, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(sender_id) DO UPDATE SET tracker = excluded.tracker, updated_at = excluded.updated_at",
+                (tracker.sender_id, serialised, updated_at)
+            )
+            self._remember(tracker.sender_id, serialised, updated_at, now)
+            self._sweep(now)
+
+    def _load(self, sender_id: Text) -> Optional[Text]:
+        now = time.monotonic()
+        with self._lock:
+            hit = self._cache.get(sender_id)
+            if hit is not None:
+                # The tracker text is only read if another server saved a newer one.
+                row = self._conn.execute(
+                    "SELECT CASE WHEN updated_at = ? THEN NULL ELSE tracker END, updated_at "
+                    "FROM trackers WHERE sender_id = ?", (hit[2], sender_id)
+                ).fetchone()
+                if row is not None and row[0] is None:
+                    self._remember(sender_id, hit[0], hit[2], now)
+                    return hit[0]
+            else:
+                row = self._conn.execute(
+                    "SELECT tracker, updated_at FROM trackers WHERE sender_id = ?", (sender_id,)
+                ).fetchone()
+            if row is None:
+                self._cache.pop(sender_id, None)
+                return None
+            self._remember(sender_id, row[0], row[1], now)
+            return row[0]
+
+    async def _retrieve(self, sender_id: Text, fetch_all_sessions: bool) -> Optional[DialogueStateTracker]:
+        serialised = self._load(sender_id)
+        if serialised is None:
+            logger.debug("Could not find tracker for conversation ID '%s'.", sender_id)
+            return None
+        tracker = self.deserialise_tracker(sender_id, serialised)
+        if not tracker or fetch_all_sessions:
+            return tracker
+        sessions = get_trackers_for_conversation_sessions(tracker)
+        return tracker if len(sessions) <= 1 else sessions[-1]
+
+    async def retrieve(self, sender_id: Text) -> Optional[DialogueStateTracker]:
+        """Returns the latest conversation session of sender_id."""
+        return await self._retrieve(sender_id, fetch_all_sessions=False)
+
+    async def retrieve_full_tracker(self, sender_id: Text) -> Optional[DialogueStateTracker]:
+        """Returns every retained event of sender_id across sessions."""
+        return await self._retrieve(sender_id, fetch_all_sessions=True)
+
+    async def exists(self, conversation_id: Text) -> bool:
+        with self._lock:
+            if conversation_id in self._cache:
+                return True
+            return self._conn.execute(
+                "SELECT 1 FROM trackers WHERE sender_id = ?", (conversation_id,)
+            ).fetchone() is not None
+
+    async def keys(self) -> Iterable[Text]:
+        """Returns the sender ids of all stored conversations."""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT sender_id FROM trackers")]
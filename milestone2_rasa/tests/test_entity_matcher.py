@@ -0,0 +1,37 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'actions')))
+
+from entity_matcher import EntityMatcher  # noqa: E402
+
+ENTITIES = {
+    'back pain', 'cold', 'flu', 'food poisoning', 'heatstroke', 'migraine',
+    'seasonal allergies', 'stomach ache', 'strep throat',
+}
+
+
+@pytest.fixture
+def matcher():
+    matcher = EntityMatcher.with_default_synonyms()
+    matcher.update(ENTITIES)
+    return matcher
+
+
+@pytest.mark.parametrize('query, entity', [
+    ('migrane', 'migraine'),
+    ('flue', 'flu'),
+    ('food poisining', 'food poisoning'),
+    ('heatstrok', 'heatstroke'),
+    ('back pian', 'back pain'),
+    ('seasonal allergy', 'seasonal allergies'),
+])
+def test_typos_find_the_condition(matcher, query, entity):
+    assert matcher.match(query) == (entity, 'fuzzy')
+
+
+@pytest.mark.parametrize('query', ['cold sore', 'stomach flu', 'throat', 'sore throat'])
+def test_other_conditions_are_not_matched(matcher, query):
+    assert matcher.match(query) == (None, None)